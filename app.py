@@ -2,7 +2,26 @@
 from flask import Flask, request, jsonify
 import mysql.connector
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from contextlib import contextmanager
+from collections import OrderedDict
+from decimal import Decimal
+import base64
+import csv
+import functools
+import hashlib
+import io
+import json
+import queue
+import re
+import threading
+import time
+import click
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 app = Flask(__name__)
 CORS(app)
@@ -15,254 +34,1207 @@ DB_CONFIG = {
     'database': 'minecraft_logs'
 }
 
+# --- Connection Pool ---
+# Most connections open at once (per process)
+POOL_SIZE = 10
+# Seconds a request waits for a free connection before it gets a 503
+POOL_TIMEOUT = 5
+# Connections older than this many seconds are closed and replaced
+POOL_RECYCLE = 1800
+# A connection idle for longer than this many seconds is pinged before it is handed out
+POOL_PING_INTERVAL = 10
+
+# --- Response Cache ---
+# Most player responses kept in memory (per process), least recently used dropped first
+RESPONSE_CACHE_SIZE = 1000
+# Seconds a cached response is kept even if the player's data_version hasn't moved
+RESPONSE_CACHE_TTL = 300
+
+# --- Live Event Stream ---
+# Seconds between polls of event_feed by the single reader thread (only while clients are connected)
+EVENT_FEED_POLL_INTERVAL = 1
+# Most feed rows read per poll
+EVENT_FEED_BATCH = 500
+# Recent events kept in memory to replay to a client reconnecting with Last-Event-ID
+EVENT_FEED_REPLAY = 1000
+# Events waiting for one client; a client that falls further behind is disconnected
+EVENT_STREAM_CLIENT_QUEUE = 1000
+# Seconds between keep-alive comments on an idle stream
+EVENT_STREAM_KEEPALIVE = 15
+
+# --- Queries ---
+# Every query the API runs, with named parameters, so check-plans can EXPLAIN them all.
+
+PLAYER_INFO_SQL = """
+    SELECT username, first_seen, last_seen, is_banned, is_muted
+    FROM players
+    WHERE username = %(username)s
+"""
+
+# The history routes page newest first by (event time, id). A page starts below the
+# cursor (before_time, before_id; both NULL on the first page), so every page is one
+# range scan of the (player id, event time) index, which InnoDB extends with the id.
+PLAYER_CHAT_SQL = """
+    SELECT c.id, c.message, c.message_type, c.server_name, c.chat_timestamp
+    FROM players p
+    JOIN chat_messages c ON c.player_id = p.id
+    WHERE p.username = %(username)s
+      AND (%(before_time)s IS NULL OR c.chat_timestamp < %(before_time)s
+           OR (c.chat_timestamp = %(before_time)s AND c.id < %(before_id)s))
+    ORDER BY c.chat_timestamp DESC, c.id DESC
+    LIMIT %(limit)s
+"""
+
+PLAYER_PUNISHMENTS_SQL = """
+    SELECT pu.id, pu.punishment_type, pu.duration, pu.reason, pu.punishment_timestamp, pu.moderator_name
+    FROM players p
+    JOIN punishments pu ON pu.player_id = p.id
+    WHERE p.username = %(username)s
+      AND (%(before_time)s IS NULL OR pu.punishment_timestamp < %(before_time)s
+           OR (pu.punishment_timestamp = %(before_time)s AND pu.id < %(before_id)s))
+    ORDER BY pu.punishment_timestamp DESC, pu.id DESC
+    LIMIT %(limit)s
+"""
+
+REPORTS_AGAINST_SQL = """
+    SELECT r.id, reporter.username AS reporter_name, r.reason, r.server_name, r.report_timestamp
+    FROM players p
+    JOIN reports r ON r.reported_id = p.id
+    JOIN players reporter ON reporter.id = r.reporter_id
+    WHERE p.username = %(username)s
+      AND (%(before_time)s IS NULL OR r.report_timestamp < %(before_time)s
+           OR (r.report_timestamp = %(before_time)s AND r.id < %(before_id)s))
+    ORDER BY r.report_timestamp DESC, r.id DESC
+    LIMIT %(limit)s
+"""
+
+REPORTS_BY_SQL = """
+    SELECT r.id, reported.username AS reported_name, r.reason, r.server_name, r.report_timestamp
+    FROM players p
+    JOIN reports r ON r.reporter_id = p.id
+    JOIN players reported ON reported.id = r.reported_id
+    WHERE p.username = %(username)s
+      AND (%(before_time)s IS NULL OR r.report_timestamp < %(before_time)s
+           OR (r.report_timestamp = %(before_time)s AND r.id < %(before_id)s))
+    ORDER BY r.report_timestamp DESC, r.id DESC
+    LIMIT %(limit)s
+"""
+
+# One branch per side of the kill, so each uses its (player id, timestamp) index;
+# an OR across killer_id and killed_id can use neither. A self-kill is taken once.
+# Each branch stops at the page size, so the merge sorts at most two pages.
+PLAYER_KILLS_SQL = """
+    SELECT k.id, killer.username AS killer, killed.username AS killed, k.timestamp
+    FROM (
+        (SELECT k.id, k.killer_id, k.killed_id, k.timestamp
+         FROM players p JOIN kill_events k ON k.killer_id = p.id
+         WHERE p.username = %(username)s
+           AND (%(before_time)s IS NULL OR k.timestamp < %(before_time)s
+                OR (k.timestamp = %(before_time)s AND k.id < %(before_id)s))
+         ORDER BY k.timestamp DESC, k.id DESC
+         LIMIT %(limit)s)
+        UNION ALL
+        (SELECT k.id, k.killer_id, k.killed_id, k.timestamp
+         FROM players p JOIN kill_events k ON k.killed_id = p.id
+         WHERE p.username = %(username)s AND k.killer_id <> k.killed_id
+           AND (%(before_time)s IS NULL OR k.timestamp < %(before_time)s
+                OR (k.timestamp = %(before_time)s AND k.id < %(before_id)s))
+         ORDER BY k.timestamp DESC, k.id DESC
+         LIMIT %(limit)s)
+    ) k
+    JOIN players killer ON killer.id = k.killer_id
+    JOIN players killed ON killed.id = k.killed_id
+    ORDER BY k.timestamp DESC, k.id DESC
+    LIMIT %(limit)s
+"""
+
+# Bumped by the parser whenever it writes rows for the player; checked before a cached response is used
+PLAYER_VERSION_SQL = """
+    SELECT data_version FROM players WHERE username = %(username)s
+"""
+
+PLAYER_FLAGS_SQL = """
+    SELECT is_banned, is_muted FROM players WHERE username = %(username)s
+"""
+
+ACTIVE_PUNISHMENTS_SQL = """
+    SELECT pu.punishment_type, pu.reason, pu.duration, pu.punishment_timestamp, pu.expires_at
+    FROM players p
+    JOIN punishments pu ON pu.player_id = p.id
+    WHERE p.username = %(username)s AND (pu.expires_at IS NULL OR pu.expires_at > %(now)s)
+    ORDER BY pu.punishment_timestamp DESC
+"""
+
+# Ranked by relevance, newest first among equals. server and since are optional (NULL).
+CHAT_SEARCH_SQL = """
+    SELECT p.username, c.message, c.message_type, c.server_name, c.chat_timestamp,
+           MATCH (c.message) AGAINST (%(q)s IN NATURAL LANGUAGE MODE) AS score
+    FROM chat_messages c
+    JOIN players p ON p.id = c.player_id
+    WHERE MATCH (c.message) AGAINST (%(q)s IN NATURAL LANGUAGE MODE)
+      AND (%(server)s IS NULL OR c.server_name = %(server)s)
+      AND (%(since)s IS NULL OR c.chat_timestamp >= %(since)s)
+    ORDER BY score DESC, c.id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+# Counters the leaderboard can rank by; columns of player_stats and player_stats_daily
+LEADERBOARD_METRICS = ('kills', 'deaths', 'messages', 'reports_filed', 'reports_received')
+
+# All time: read backwards down the rollup's index on the metric; both keys descend,
+# so ties stay on the index order instead of forcing a filesort
+LEADERBOARD_SQL = """
+    SELECT p.username, s.kills, s.deaths, s.messages, s.reports_filed, s.reports_received
+    FROM player_stats s
+    JOIN players p ON p.id = s.player_id
+    ORDER BY s.{metric} DESC, s.player_id DESC
+    LIMIT %(limit)s
+"""
+
+# A window sums the daily buckets since a day; the raw events are never scanned
+LEADERBOARD_WINDOW_SQL = """
+    SELECT p.username, w.kills, w.deaths, w.messages, w.reports_filed, w.reports_received
+    FROM (
+        SELECT player_id, SUM(kills) AS kills, SUM(deaths) AS deaths, SUM(messages) AS messages,
+               SUM(reports_filed) AS reports_filed, SUM(reports_received) AS reports_received
+        FROM player_stats_daily
+        WHERE day >= %(since_day)s
+        GROUP BY player_id
+    ) w
+    JOIN players p ON p.id = w.player_id
+    ORDER BY w.{metric} DESC, w.player_id DESC
+    LIMIT %(limit)s
+"""
+
+# /player/<username>/profile resolves the player once, then reads each section by
+# player id with its own limit. Keyed by section name.
+PROFILE_PLAYER_SQL = """
+    SELECT id, username, first_seen, last_seen, is_banned, is_muted
+    FROM players
+    WHERE username = %(username)s
+"""
+
+PROFILE_SECTION_SQL = {
+    'chat': """
+        SELECT message, message_type, server_name, chat_timestamp
+        FROM chat_messages
+        WHERE player_id = %(player_id)s
+        ORDER BY chat_timestamp DESC
+        LIMIT %(limit)s
+    """,
+    'punishments': """
+        SELECT punishment_type, duration, reason, punishment_timestamp, moderator_name
+        FROM punishments
+        WHERE player_id = %(player_id)s
+        ORDER BY punishment_timestamp DESC
+        LIMIT %(limit)s
+    """,
+    'reports_against': """
+        SELECT reporter.username AS reporter_name, r.reason, r.server_name, r.report_timestamp
+        FROM reports r
+        JOIN players reporter ON reporter.id = r.reporter_id
+        WHERE r.reported_id = %(player_id)s
+        ORDER BY r.report_timestamp DESC
+        LIMIT %(limit)s
+    """,
+    'reports_by': """
+        SELECT reported.username AS reported_name, r.reason, r.server_name, r.report_timestamp
+        FROM reports r
+        JOIN players reported ON reported.id = r.reported_id
+        WHERE r.reporter_id = %(player_id)s
+        ORDER BY r.report_timestamp DESC
+        LIMIT %(limit)s
+    """,
+    # Each branch stops at the limit on its own index, so the merge sorts at most twice that
+    'kills': """
+        SELECT killer.username AS killer, killed.username AS killed, k.timestamp
+        FROM (
+            (SELECT killer_id, killed_id, timestamp
+             FROM kill_events
+             WHERE killer_id = %(player_id)s
+             ORDER BY timestamp DESC
+             LIMIT %(limit)s)
+            UNION ALL
+            (SELECT killer_id, killed_id, timestamp
+             FROM kill_events
+             WHERE killed_id = %(player_id)s AND killer_id <> killed_id
+             ORDER BY timestamp DESC
+             LIMIT %(limit)s)
+        ) k
+        JOIN players killer ON killer.id = k.killer_id
+        JOIN players killed ON killed.id = k.killed_id
+        ORDER BY k.timestamp DESC
+        LIMIT %(limit)s
+    """
+}
+
+# Sections of a profile, in response order
+PROFILE_SECTIONS = ('info',) + tuple(PROFILE_SECTION_SQL)
+
+# /export streams every event of a player or a server in one row layout, one event
+# table after the other, each in time order straight off a (filter, event time) index.
+# {filter} narrows the rows to the player or server; since and until are optional (NULL).
+EXPORT_COLUMNS = ('event_type', 'timestamp', 'username', 'other_username', 'server_name', 'action', 'duration', 'text')
+
+EXPORT_SQL = {
+    'chat': """
+        SELECT 'chat', c.chat_timestamp, p.username, NULL, c.server_name, c.message_type, NULL, c.message
+        FROM chat_messages c
+        JOIN players p ON p.id = c.player_id
+        WHERE {filter}
+          AND (%(since)s IS NULL OR c.chat_timestamp >= %(since)s)
+          AND (%(until)s IS NULL OR c.chat_timestamp < %(until)s)
+        ORDER BY c.chat_timestamp
+    """,
+    'punishment': """
+        SELECT 'punishment', pu.punishment_timestamp, p.username, pu.moderator_name, pu.server_name,
+               pu.punishment_type, pu.duration, pu.reason
+        FROM punishments pu
+        JOIN players p ON p.id = pu.player_id
+        WHERE {filter}
+          AND (%(since)s IS NULL OR pu.punishment_timestamp >= %(since)s)
+          AND (%(until)s IS NULL OR pu.punishment_timestamp < %(until)s)
+        ORDER BY pu.punishment_timestamp
+    """,
+    'report': """
+        SELECT 'report', r.report_timestamp, reporter.username, reported.username, r.server_name, NULL, NULL, r.reason
+        FROM reports r
+        JOIN players reporter ON reporter.id = r.reporter_id
+        JOIN players reported ON reported.id = r.reported_id
+        WHERE {filter}
+          AND (%(since)s IS NULL OR r.report_timestamp >= %(since)s)
+          AND (%(until)s IS NULL OR r.report_timestamp < %(until)s)
+        ORDER BY r.report_timestamp
+    """,
+    'kill': """
+        SELECT 'kill', k.timestamp, killer.username, killed.username, k.server_name, NULL, NULL, NULL
+        FROM kill_events k
+        JOIN players killer ON killer.id = k.killer_id
+        JOIN players killed ON killed.id = k.killed_id
+        WHERE {filter}
+          AND (%(since)s IS NULL OR k.timestamp >= %(since)s)
+          AND (%(until)s IS NULL OR k.timestamp < %(until)s)
+        ORDER BY k.timestamp
+    """
+}
+
+# A player's export: one query per side of reports and kills, like PLAYER_KILLS_SQL
+EXPORT_PLAYER_QUERIES = [
+    EXPORT_SQL['chat'].format(filter="c.player_id = %(player_id)s"),
+    EXPORT_SQL['punishment'].format(filter="pu.player_id = %(player_id)s"),
+    EXPORT_SQL['report'].format(filter="r.reporter_id = %(player_id)s"),
+    EXPORT_SQL['report'].format(filter="r.reported_id = %(player_id)s AND r.reporter_id <> r.reported_id"),
+    EXPORT_SQL['kill'].format(filter="k.killer_id = %(player_id)s"),
+    EXPORT_SQL['kill'].format(filter="k.killed_id = %(player_id)s AND k.killer_id <> k.killed_id")
+]
+
+EXPORT_SERVER_QUERIES = [
+    EXPORT_SQL['chat'].format(filter="c.server_name = %(server_name)s"),
+    EXPORT_SQL['punishment'].format(filter="pu.server_name = %(server_name)s"),
+    EXPORT_SQL['report'].format(filter="r.server_name = %(server_name)s"),
+    EXPORT_SQL['kill'].format(filter="k.server_name = %(server_name)s")
+]
+
+# Written by the parser together with the events; read forward by id (the primary key)
+EVENT_FEED_SQL = """
+    SELECT id, event_type, event_time, username, other_username, server_name, duration, text
+    FROM event_feed
+    WHERE id > %(after_id)s
+    ORDER BY id
+    LIMIT %(limit)s
+"""
+
+# /players/batch looks players up by name, one IN list ({names}) per chunk. The counts
+# variant adds the player_stats rollup; players without a stats row count zero.
+PLAYERS_BATCH_SQL = """
+    SELECT username, first_seen, last_seen, is_banned, is_muted
+    FROM players
+    WHERE username IN ({names})
+"""
+
+PLAYERS_BATCH_COUNTS_SQL = """
+    SELECT p.username, p.first_seen, p.last_seen, p.is_banned, p.is_muted,
+           COALESCE(s.kills, 0) AS kills, COALESCE(s.deaths, 0) AS deaths, COALESCE(s.messages, 0) AS messages,
+           COALESCE(s.reports_filed, 0) AS reports_filed, COALESCE(s.reports_received, 0) AS reports_received
+    FROM players p
+    LEFT JOIN player_stats s ON s.player_id = p.id
+    WHERE p.username IN ({names})
+"""
+
+# Types the parser writes to event_feed
+EVENT_FEED_TYPES = ('ban', 'mute', 'report', 'kill')
+
+API_QUERIES = {
+    'player_info': PLAYER_INFO_SQL,
+    'player_chat': PLAYER_CHAT_SQL,
+    'player_punishments': PLAYER_PUNISHMENTS_SQL,
+    'reports_against': REPORTS_AGAINST_SQL,
+    'reports_by': REPORTS_BY_SQL,
+    'player_kills': PLAYER_KILLS_SQL,
+    'player_version': PLAYER_VERSION_SQL,
+    'player_flags': PLAYER_FLAGS_SQL,
+    'active_punishments': ACTIVE_PUNISHMENTS_SQL,
+    'chat_search': CHAT_SEARCH_SQL,
+    'leaderboard': LEADERBOARD_SQL.format(metric='kills'),
+    'leaderboard_window': LEADERBOARD_WINDOW_SQL.format(metric='kills'),
+    'profile_player': PROFILE_PLAYER_SQL,
+    **{f'profile_{section}': sql for section, sql in PROFILE_SECTION_SQL.items()},
+    **{f'export_player_{i}': sql for i, sql in enumerate(EXPORT_PLAYER_QUERIES, start=1)},
+    **{f'export_server_{i}': sql for i, sql in enumerate(EXPORT_SERVER_QUERIES, start=1)},
+    'event_feed': EVENT_FEED_SQL,
+    'players_batch': PLAYERS_BATCH_SQL.format(names='%(username)s'),
+    'players_batch_counts': PLAYERS_BATCH_COUNTS_SQL.format(names='%(username)s')
+}
+
+# Page size of /chat/search: default and largest allowed
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+# Leaderboard length: default and largest allowed, and the longest window in days
+LEADERBOARD_SIZE = 10
+LEADERBOARD_MAX_SIZE = 100
+LEADERBOARD_MAX_WINDOW_DAYS = 365
+
+# Most usernames one /players/batch request may ask for, and names per IN list
+PLAYERS_BATCH_MAX = 1000
+PLAYERS_BATCH_CHUNK = 200
+
+# Rows per page of the history routes (limit=): default and largest allowed
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Rows per profile section (<section>_limit): default and largest allowed
+PROFILE_SECTION_LIMIT = 100
+PROFILE_MAX_SECTION_LIMIT = 1000
+
+# Rows an export reads from MySQL and writes out at a time
+EXPORT_CHUNK_ROWS = 1000
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within POOL_TIMEOUT."""
+
+class DatabaseUnavailable(Exception):
+    """A new connection to MySQL could not be opened."""
+
+class ConnectionPool:
+    """
+    A fixed number of MySQL connections shared by all requests of the process.
+    Connections are opened lazily, pinged before reuse when they have been idle
+    for a while, and replaced once they are older than `recycle` seconds.
+    Borrow one with `with pool.connection() as conn:`; it goes back on exit.
+    A connection whose block raised is closed rather than reused, as it may be
+    left mid-result (e.g. by an export the client abandoned).
+    """
+
+    def __init__(self, config, size=POOL_SIZE, timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE,
+                 ping_interval=POOL_PING_INTERVAL):
+        self.config = config
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        # One slot per connection: (conn, opened_at, returned_at), or None if not opened yet
+        self.slots = queue.LifoQueue()
+        for _ in range(size):
+            self.slots.put(None)
+
+    @contextmanager
+    def connection(self):
+        slot = self._acquire()
+        conn = slot[0]
+        try:
+            yield conn
+        except BaseException:
+            self._close(conn)
+            self.slots.put(None)
+            raise
+        self.slots.put((conn, slot[1], time.monotonic()))
+
+    def _acquire(self):
+        try:
+            slot = self.slots.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+        try:
+            return self._check(slot)
+        except Exception:
+            # Give the slot back empty, so the pool keeps its size
+            self.slots.put(None)
+            raise
+
+    def _check(self, slot):
+        now = time.monotonic()
+        if slot is not None:
+            conn, opened_at, returned_at = slot
+            if now - opened_at > self.recycle:
+                self._close(conn)
+            elif now - returned_at <= self.ping_interval:
+                return slot
+            else:
+                try:
+                    conn.ping(reconnect=False)
+                    return slot
+                except mysql.connector.Error:
+                    self._close(conn)
+        try:
+            conn = mysql.connector.connect(**self.config)
+        except mysql.connector.Error as err:
+            print(f"Error connecting to MySQL: {err}")
+            raise DatabaseUnavailable(str(err))
+        # Without autocommit a reused connection would keep reading its first snapshot
+        conn.autocommit = True
+        return (conn, now, now)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+db_pool = ConnectionPool(DB_CONFIG)
+
 def get_db_connection():
-    """Establishes and returns a connection to the MySQL database."""
-    try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
-    except mysql.connector.Error as err:
-        print(f"Error connecting to MySQL: {err}")
-        return None
+    """Borrows a pooled connection to the MySQL database, as a context manager."""
+    return db_pool.connection()
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(err):
+    return jsonify({"error": "Server busy, try again", "details": str(err)}), 503
+
+@app.errorhandler(DatabaseUnavailable)
+def database_unavailable(err):
+    return jsonify({"error": "Database connection failed", "details": str(err)}), 500
+
+def json_default(value):
+    """Encodes the MySQL types the JSON backends don't know."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # SUM() and friends come back as Decimal
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', 'replace')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_stdlib(payload):
+    """Encodes a payload to JSON bytes with the standard library."""
+    return json.dumps(payload, default=json_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+def dumps_orjson(payload):
+    """Encodes a payload to JSON bytes with orjson, which formats datetimes itself."""
+    return orjson.dumps(payload, default=json_default)
+
+# orjson is several times faster on large row lists; it's optional
+dumps = dumps_orjson if orjson is not None else dumps_stdlib
+
+def rows_as_dicts(cursor, rows):
+    """Pairs tuple rows from a plain cursor with the cursor's column names."""
+    columns = cursor.column_names
+    return [dict(zip(columns, row)) for row in rows]
+
+def json_response(payload, status=200):
+    """Sends a payload of rows as JSON; datetimes and Decimals are converted by the encoder."""
+    return app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+class ResponseCache:
+    """
+    LRU cache of serialized JSON responses, each stored with the data_version of
+    the player it is about. An entry is only served while that version is current
+    and for at most `ttl` seconds.
+    """
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        # key -> (data_version, stored_at, body)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version or time.monotonic() - entry[1] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key, version, body):
+        with self.lock:
+            self.entries[key] = (version, time.monotonic(), body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+response_cache = ResponseCache()
+
+def player_data_version(username):
+    """Returns the player's data_version, or None if there is no such player."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(PLAYER_VERSION_SQL, {"username": username})
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+
+def cached_by_player_version(view):
+    """
+    Caches a player route's successful responses in response_cache, keyed by the
+    route, the username and the query string, and tags them with an ETag derived
+    from the same key and the player's data_version. A request whose If-None-Match
+    still matches gets a 304 without the route's queries or any serialization;
+    otherwise a cached body is served while the version is unchanged.
+    """
+    @functools.wraps(view)
+    def wrapper(username):
+        try:
+            version = player_data_version(username)
+        except mysql.connector.Error as err:
+            # Without the version nothing can be trusted; serve uncached
+            print(f"Error reading the data version of {username}: {err}")
+            return view(username)
+        if version is None:
+            return view(username)  # The route answers the 404
+
+        # The version is read before the route runs, so a write in between only costs a miss
+        key = (view.__name__, username, tuple(sorted(request.args.items(multi=True))))
+        etag = hashlib.sha1(repr((key, version)).encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            body = response_cache.get(key, version)
+            if body is not None:
+                response = app.response_class(body, mimetype='application/json')
+            else:
+                response = app.make_response(view(username))
+                if response.status_code != 200:
+                    return response
+                response_cache.put(key, version, response.get_data())
+        response.set_etag(etag)
+        # Browsers keep the response but revalidate it, which is the 304 above
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+class EventFeed:
+    """
+    Fans the parser's event_feed out to every connected /events/stream client.
+    One reader thread per process polls the table while anyone is subscribed and
+    encodes each event once; clients only filter what they receive. The newest
+    EVENT_FEED_REPLAY events are kept for clients reconnecting with Last-Event-ID.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.recent = []
+        self.last_id = None
+        self.reader = None
+
+    def subscribe(self, last_event_id=None):
+        """Returns a queue receiving (event, encoded) pairs, starting the reader if needed."""
+        subscriber = queue.Queue(maxsize=EVENT_STREAM_CLIENT_QUEUE)
+        with self.lock:
+            if last_event_id is not None:
+                for item in self.recent:
+                    if item[0]['id'] > last_event_id:
+                        subscriber.put_nowait(item)
+            self.subscribers.add(subscriber)
+            if self.reader is None or not self.reader.is_alive():
+                # A reconnecting client resumes the new reader where the old one stopped (or where
+                # the client did, if that is newer), so the events of the gap reach it; others start
+                # at the tail. recent already holds everything up to the old last_id.
+                if last_event_id is None:
+                    self.last_id = None
+                else:
+                    self.last_id = max(last_event_id, self.last_id or 0)
+                self.reader = threading.Thread(target=self._read, name="event feed", daemon=True)
+                self.reader.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def is_subscribed(self, subscriber):
+        with self.lock:
+            return subscriber in self.subscribers
+
+    def _read(self):
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    # Stops polling when the last client leaves; last_id is kept for the next reader
+                    self.reader = None
+                    return
+            try:
+                events = self._poll()
+            except (mysql.connector.Error, PoolTimeout, DatabaseUnavailable) as err:
+                print(f"Error reading the event feed: {err}")
+                events = []
+            if events:
+                self._publish(events)
+            time.sleep(EVENT_FEED_POLL_INTERVAL)
+
+    def _poll(self):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if self.last_id is None:
+                    # Streams start at the tail; history is what the other routes are for
+                    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM event_feed")
+                    self.last_id = cursor.fetchone()[0]
+                    return []
+                cursor.execute(EVENT_FEED_SQL, {"after_id": self.last_id, "limit": EVENT_FEED_BATCH})
+                events = rows_as_dicts(cursor, cursor.fetchall())
+            finally:
+                cursor.close()
+        if events:
+            self.last_id = events[-1]['id']
+        return events
+
+    def _publish(self, events):
+        items = [(event, dumps(event)) for event in events]
+        with self.lock:
+            self.recent = (self.recent + items)[-EVENT_FEED_REPLAY:]
+            for subscriber in list(self.subscribers):
+                try:
+                    for item in items:
+                        subscriber.put_nowait(item)
+                except queue.Full:
+                    # Too slow to keep up; its stream ends and the browser reconnects
+                    self.subscribers.discard(subscriber)
+
+event_feed = EventFeed()
 
 @app.route('/')
 def index():
     return "Minecraft Player Data API is running!"
 
 @app.route('/player/<username>', methods=['GET'])
+@cached_by_player_version
 def get_player_info(username):
     """Fetches general player information."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(PLAYER_INFO_SQL, {"username": username})
+            player_info = cursor.fetchone()
+
+            if not player_info:
+                return jsonify({"message": "Player not found"}), 404
+
+            return json_response(rows_as_dicts(cursor, [player_info])[0])
+
+        except mysql.connector.Error as err:
+            print(f"Error fetching player info for {username}: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+
+def encode_cursor(event_time, row_id):
+    """Returns the opaque next_cursor pointing below the row (event_time, row_id)."""
+    return base64.urlsafe_b64encode(f"{event_time.isoformat()},{row_id}".encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Returns (event_time, row_id) of a cursor; raises ValueError if it is malformed."""
     try:
-        cursor.execute("""
-            SELECT username, first_seen, last_seen, is_banned, is_muted
-            FROM players
-            WHERE username = %s
-        """, (username,))
-        player_info = cursor.fetchone()
-
-        if not player_info:
-            return jsonify({"message": "Player not found"}), 404
-
-        # Convert datetime objects to string for JSON serialization
-        for key in ['first_seen', 'last_seen']:
-            if player_info.get(key):
-                player_info[key] = player_info[key].isoformat()
-
-        return jsonify(player_info)
-
-    except mysql.connector.Error as err:
-        print(f"Error fetching player info for {username}: {err}")
-        return jsonify({"error": "Database query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+        text = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        event_time, row_id = text.rsplit(',', 1)
+        return datetime.fromisoformat(event_time), int(row_id)
+    except (ValueError, UnicodeDecodeError) as err:
+        raise ValueError(f"Invalid cursor: {err}")
+
+def get_history_page(username, sql, time_column, description):
+    """
+    Serves one page of a player's history, newest first.
+    Query parameters: before (the next_cursor of the previous page) and limit.
+    Responds with {"items": [...], "next_cursor": ...}; next_cursor is null on the last page.
+    """
+    try:
+        before = request.args.get('before')
+        before_time, before_id = decode_cursor(before) if before else (None, None)
+        limit = min(max(1, int(request.args.get('limit', HISTORY_PAGE_SIZE))), HISTORY_MAX_PAGE_SIZE)
+    except ValueError as err:
+        return jsonify({"error": "Invalid parameter", "details": str(err)}), 400
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # One extra row tells whether there is a next page
+            cursor.execute(sql, {"username": username, "before_time": before_time,
+                                 "before_id": before_id, "limit": limit + 1})
+            items = rows_as_dicts(cursor, cursor.fetchall())
+            next_cursor = None
+            if len(items) > limit:
+                items = items[:limit]
+                next_cursor = encode_cursor(items[-1][time_column], items[-1]['id'])
+
+            return json_response({"items": items, "next_cursor": next_cursor})
+
+        except mysql.connector.Error as err:
+            print(f"Error fetching {description} for {username}: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
 
 @app.route('/player/<username>/chat', methods=['GET'])
+@cached_by_player_version
 def get_player_chat(username):
-    """Fetches chat messages for a player."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT message, message_type, server_name, chat_timestamp
-            FROM chat_messages
-            WHERE username = %s
-            ORDER BY chat_timestamp DESC
-            LIMIT 100
-        """, (username,))
-        chat_messages = cursor.fetchall()
-
-        for msg in chat_messages:
-            if msg.get('chat_timestamp'):
-                msg['chat_timestamp'] = msg['chat_timestamp'].isoformat()
-
-        return jsonify(chat_messages)
-
-    except mysql.connector.Error as err:
-        print(f"Error fetching chat messages for {username}: {err}")
-        return jsonify({"error": "Database query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    """Fetches a page of chat messages for a player."""
+    return get_history_page(username, PLAYER_CHAT_SQL, 'chat_timestamp', "chat messages")
 
 @app.route('/player/<username>/punishments', methods=['GET'])
+@cached_by_player_version
 def get_player_punishments(username):
-    """Fetches punishment history for a player."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT punishment_type, duration, reason, punishment_timestamp, moderator_name
-            FROM punishments
-            WHERE username = %s
-            ORDER BY punishment_timestamp DESC
-        """, (username,))
-        punishments = cursor.fetchall()
-
-        for p in punishments:
-            if p.get('punishment_timestamp'):
-                p['punishment_timestamp'] = p['punishment_timestamp'].isoformat()
-
-        return jsonify(punishments)
-
-    except mysql.connector.Error as err:
-        print(f"Error fetching punishments for {username}: {err}")
-        return jsonify({"error": "Database query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    """Fetches a page of punishment history for a player."""
+    return get_history_page(username, PLAYER_PUNISHMENTS_SQL, 'punishment_timestamp', "punishments")
 
 @app.route('/player/<username>/reports_against', methods=['GET'])
+@cached_by_player_version
 def get_player_reports_against(username):
-    """Fetches reports made against a player."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT reporter_name, reason, server_name, report_timestamp
-            FROM reports
-            WHERE reported_name = %s
-            ORDER BY report_timestamp DESC
-        """, (username,))
-        reports = cursor.fetchall()
-
-        for r in reports:
-            if r.get('report_timestamp'):
-                r['report_timestamp'] = r['report_timestamp'].isoformat()
-
-        return jsonify(reports)
-
-    except mysql.connector.Error as err:
-        print(f"Error fetching reports against {username}: {err}")
-        return jsonify({"error": "Database query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    """Fetches a page of reports made against a player."""
+    return get_history_page(username, REPORTS_AGAINST_SQL, 'report_timestamp', "reports against")
 
 @app.route('/player/<username>/reports_by', methods=['GET'])
+@cached_by_player_version
 def get_player_reports_by(username):
-    """Fetches reports made by a player."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    
-    try:
-        cursor.execute("""
-            SELECT reported_name, reason, server_name, report_timestamp
-            FROM reports
-            WHERE reporter_name = %s
-            ORDER BY report_timestamp DESC
-        """, (username,))
-        reports = cursor.fetchall()
-
-        for r in reports:
-            if r.get('report_timestamp'):
-                r['report_timestamp'] = r['report_timestamp'].isoformat()
-
-        return jsonify(reports)
-
-    except mysql.connector.Error as err:
-        print(f"Error fetching reports by {username}: {err}")
-        return jsonify({"error": "Database query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    """Fetches a page of reports made by a player."""
+    return get_history_page(username, REPORTS_BY_SQL, 'report_timestamp', "reports by")
 
 @app.route('/player/<username>/kills', methods=['GET'])
+@cached_by_player_version
 def get_player_kills(username):
-    """Fetches kill history for a player."""
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    
+    """Fetches a page of kill history for a player."""
+    return get_history_page(username, PLAYER_KILLS_SQL, 'timestamp', "kill history")
+
+@app.route('/player/<username>/profile', methods=['GET'])
+@cached_by_player_version
+def get_player_profile(username):
+    """
+    Fetches a player's info and history in one response, on one connection.
+    Query parameters: include (comma-separated sections, default all of info,
+    chat, punishments, reports_against, reports_by, kills) and <section>_limit.
+    """
+    include = request.args.get('include')
+    sections = [s.strip() for s in include.split(',') if s.strip()] if include else list(PROFILE_SECTIONS)
+    unknown = [s for s in sections if s not in PROFILE_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown section(s) {', '.join(unknown)}; "
+                                 f"use: {', '.join(PROFILE_SECTIONS)}"}), 400
+    try:
+        limits = {section: min(max(1, int(request.args.get(f'{section}_limit', PROFILE_SECTION_LIMIT))),
+                               PROFILE_MAX_SECTION_LIMIT)
+                  for section in sections if section in PROFILE_SECTION_SQL}
+    except ValueError as err:
+        return jsonify({"error": "Invalid parameter", "details": str(err)}), 400
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # The player is looked up once; the sections go straight to the event tables by id
+            cursor.execute(PROFILE_PLAYER_SQL, {"username": username})
+            player = cursor.fetchone()
+            if not player:
+                return jsonify({"message": "Player not found"}), 404
+            player = rows_as_dicts(cursor, [player])[0]
+            player_id = player.pop('id')
+
+            profile = {}
+            for section in sections:
+                if section == 'info':
+                    profile[section] = player
+                else:
+                    cursor.execute(PROFILE_SECTION_SQL[section], {"player_id": player_id, "limit": limits[section]})
+                    profile[section] = rows_as_dicts(cursor, cursor.fetchall())
+
+            return json_response(profile)
+
+        except mysql.connector.Error as err:
+            print(f"Error fetching the profile of {username}: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+
+def export_chunks(queries, params, export_format):
+    """
+    Yields an export as chunks of up to EXPORT_CHUNK_ROWS rows, read with an
+    unbuffered cursor so only one chunk is ever in memory. The first chunk (the CSV
+    header, or nothing) comes as soon as a pooled connection is borrowed.
+    """
+    with get_db_connection() as conn:
+        # Unbuffered: rows are read off the socket as they are fetched
+        cursor = conn.cursor(buffered=False)
+        try:
+            if export_format == 'csv':
+                out = io.StringIO()
+                writer = csv.writer(out)
+                writer.writerow(EXPORT_COLUMNS)
+                yield out.getvalue()
+            else:
+                yield b''
+            for sql in queries:
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                    if not rows:
+                        break
+                    if export_format == 'csv':
+                        out.seek(0)
+                        out.truncate()
+                        writer.writerows([value.isoformat() if isinstance(value, datetime) else value
+                                          for value in row] for row in rows)
+                        yield out.getvalue()
+                    else:
+                        yield b''.join(dumps(dict(zip(EXPORT_COLUMNS, row))) + b'\n' for row in rows)
+        except mysql.connector.Error as err:
+            # The status is already sent; the client sees the export cut short
+            print(f"Error streaming an export: {err}")
+            raise
+        finally:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass  # Rows left unread by an abandoned export; the pool drops the connection
+
+def export_response(queries, params, export_format, name):
+    """Streams the rows of queries as an NDJSON or CSV download named after name."""
+    chunks = export_chunks(queries, params, export_format)
+    # Borrowing now turns a busy pool into a 503 instead of an empty download
+    first = next(chunks)
+
+    def body():
+        yield first
+        yield from chunks
+
+    filename = re.sub(r'[^A-Za-z0-9_.-]+', '_', name) + '.' + export_format
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return app.response_class(body(), mimetype=mimetype,
+                              headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+def export_args():
+    """
+    Reads format (ndjson or csv), since and until (ISO dates or datetimes; until
+    is exclusive) of an export. Raises ValueError if one is invalid.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        raise ValueError("format must be ndjson or csv")
+    since = request.args.get('since')
+    until = request.args.get('until')
+    return export_format, {"since": datetime.fromisoformat(since) if since else None,
+                           "until": datetime.fromisoformat(until) if until else None}
+
+@app.route('/export/player/<username>', methods=['GET'])
+def export_player(username):
+    """
+    Streams a player's whole history (chat, punishments, reports by and against,
+    kills and deaths) as NDJSON or CSV. Query parameters: format, since, until.
+    """
+    try:
+        export_format, params = export_args()
+    except ValueError as err:
+        return jsonify({"error": "Invalid parameter", "details": str(err)}), 400
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(PROFILE_PLAYER_SQL, {"username": username})
+            player = cursor.fetchone()
+            player = rows_as_dicts(cursor, [player])[0] if player else None
+        except mysql.connector.Error as err:
+            print(f"Error looking up {username} for an export: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+    if not player:
+        return jsonify({"message": "Player not found"}), 404
+
+    params['player_id'] = player['id']
+    return export_response(EXPORT_PLAYER_QUERIES, params, export_format, f"player-{player['username']}")
+
+@app.route('/export/server/<server_name>', methods=['GET'])
+def export_server(server_name):
+    """
+    Streams every event logged on a server as NDJSON or CSV.
+    Query parameters: format, since, until.
+    """
     try:
-        cursor.execute("""
-            SELECT killer, killed, timestamp
-            FROM kill_events
-            WHERE killer = %s OR killed = %s
-            ORDER BY timestamp DESC
-        """, (username, username))
-        kills = cursor.fetchall()
-        
-        for k in kills:
-            if k.get('timestamp'):
-                k['timestamp'] = k['timestamp'].isoformat()
-        
-        return jsonify(kills)
-        
-    except mysql.connector.Error as err:
-        print(f"Error fetching kill history for {username}: {err}")
-        return jsonify({"error": "Database query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
-        
+        export_format, params = export_args()
+    except ValueError as err:
+        return jsonify({"error": "Invalid parameter", "details": str(err)}), 400
+
+    params['server_name'] = server_name
+    return export_response(EXPORT_SERVER_QUERIES, params, export_format, f"server-{server_name}")
+
+@app.route('/players/batch', methods=['POST'])
+def get_players_batch():
+    """
+    Looks up many players at once, e.g. a whole lobby. JSON body:
+    {"usernames": [...], "counts": false}. With counts, each player also gets
+    kills, deaths, messages, reports_filed and reports_received.
+    Responds with {"players": [...], "not_found": [...]}.
+    """
+    body = request.get_json(silent=True)
+    usernames = body.get('usernames') if isinstance(body, dict) else None
+    if not isinstance(usernames, list) or not all(isinstance(u, str) for u in usernames):
+        return jsonify({"error": "Expected a JSON body like {\"usernames\": [\"name\", ...]}"}), 400
+    # Names compare case-insensitively in MySQL, so duplicates are dropped the same way
+    unique = {}
+    for username in usernames:
+        username = username.strip()
+        if username:
+            unique.setdefault(username.lower(), username)
+    usernames = list(unique.values())
+    if len(usernames) > PLAYERS_BATCH_MAX:
+        return jsonify({"error": f"At most {PLAYERS_BATCH_MAX} usernames per request"}), 400
+    sql = PLAYERS_BATCH_COUNTS_SQL if body.get('counts') else PLAYERS_BATCH_SQL
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            players = []
+            for start in range(0, len(usernames), PLAYERS_BATCH_CHUNK):
+                chunk = usernames[start:start + PLAYERS_BATCH_CHUNK]
+                names = ", ".join(f"%(u{i})s" for i in range(len(chunk)))
+                cursor.execute(sql.format(names=names), {f"u{i}": username for i, username in enumerate(chunk)})
+                players.extend(rows_as_dicts(cursor, cursor.fetchall()))
+
+            found = {player['username'].lower() for player in players}
+            not_found = [username for username in usernames if username.lower() not in found]
+
+            return json_response({"players": players, "not_found": not_found})
+
+        except mysql.connector.Error as err:
+            print(f"Error looking up {len(usernames)} players: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+
+@app.route('/events/stream', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events stream of new bans, mutes, reports and kills as the parser
+    writes them. Query parameters: player (only events involving that player) and
+    types (comma-separated, default all of ban, mute, report, kill).
+    """
+    types = request.args.get('types')
+    types = {t.strip() for t in types.split(',') if t.strip()} if types else set(EVENT_FEED_TYPES)
+    unknown = types.difference(EVENT_FEED_TYPES)
+    if unknown:
+        return jsonify({"error": f"Unknown type(s) {', '.join(sorted(unknown))}; "
+                                 f"use: {', '.join(EVENT_FEED_TYPES)}"}), 400
+    player = (request.args.get('player') or '').strip().lower() or None
+    try:
+        last_event_id = request.headers.get('Last-Event-ID')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscriber = event_feed.subscribe(last_event_id)
+
+    def body():
+        try:
+            # Sends the headers right away, so the browser sees the stream open
+            yield b": connected\n\n"
+            while event_feed.is_subscribed(subscriber):
+                try:
+                    event, encoded = subscriber.get(timeout=EVENT_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle stream and finds clients that left
+                    yield b": keepalive\n\n"
+                    continue
+                if event['event_type'] not in types:
+                    continue
+                if player and player not in ((event['username'] or '').lower(),
+                                             (event['other_username'] or '').lower()):
+                    continue
+                yield (f"id: {event['id']}\nevent: {event['event_type']}\ndata: ".encode()
+                       + encoded + b"\n\n")
+        finally:
+            event_feed.unsubscribe(subscriber)
+
+    return app.response_class(body(), mimetype='text/event-stream',
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/chat/search', methods=['GET'])
+def search_chat():
+    """
+    Full-text search over chat messages, ranked by relevance.
+    Query parameters: q (required), server, since (ISO date or datetime),
+    page (from 1) and per_page.
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "Missing search text (q)"}), 400
+    try:
+        since = request.args.get('since')
+        since = datetime.fromisoformat(since) if since else None
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(max(1, int(request.args.get('per_page', SEARCH_PAGE_SIZE))), SEARCH_MAX_PAGE_SIZE)
+    except ValueError as err:
+        return jsonify({"error": "Invalid parameter", "details": str(err)}), 400
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # One extra row tells whether there is a next page
+            cursor.execute(CHAT_SEARCH_SQL, {
+                "q": q,
+                "server": request.args.get('server') or None,
+                "since": since,
+                "limit": per_page + 1,
+                "offset": (page - 1) * per_page
+            })
+            messages = cursor.fetchall()
+            has_more = len(messages) > per_page
+            messages = rows_as_dicts(cursor, messages[:per_page])
+
+            return json_response({"results": messages, "page": page, "per_page": per_page, "has_more": has_more})
+
+        except mysql.connector.Error as err:
+            print(f"Error searching chat for {q!r}: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+
+@app.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """
+    Top players by a counter, served from the player_stats rollups.
+    Query parameters: metric (kills, deaths, messages, reports_filed,
+    reports_received), window ('all' or a number of days like '7d') and limit.
+    """
+    metric = request.args.get('metric', 'kills')
+    if metric not in LEADERBOARD_METRICS:
+        return jsonify({"error": f"Unknown metric, use one of: {', '.join(LEADERBOARD_METRICS)}"}), 400
+    window = request.args.get('window', 'all')
+    try:
+        limit = min(max(1, int(request.args.get('limit', LEADERBOARD_SIZE))), LEADERBOARD_MAX_SIZE)
+        days = None if window == 'all' else int(window.rstrip('d'))
+    except ValueError:
+        return jsonify({"error": "Invalid window or limit, e.g. window=7d&limit=10"}), 400
+    if days is not None and not 1 <= days <= LEADERBOARD_MAX_WINDOW_DAYS:
+        return jsonify({"error": f"window must be between 1d and {LEADERBOARD_MAX_WINDOW_DAYS}d"}), 400
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        try:
+            if days is None:
+                cursor.execute(LEADERBOARD_SQL.format(metric=metric), {"limit": limit})
+            else:
+                # Today counts as the window's last day
+                since_day = date.today() - timedelta(days=days - 1)
+                cursor.execute(LEADERBOARD_WINDOW_SQL.format(metric=metric), {"since_day": since_day, "limit": limit})
+            leaders = rows_as_dicts(cursor, cursor.fetchall())
+
+            for rank, leader in enumerate(leaders, start=1):
+                leader['rank'] = rank
+                # int() as SUM() comes back as Decimal
+                leader['kd'] = round(int(leader['kills']) / max(int(leader['deaths']), 1), 2)
+
+            return json_response({"metric": metric, "window": window, "leaders": leaders})
+
+        except mysql.connector.Error as err:
+            print(f"Error fetching the {metric} leaderboard: {err}")
+            return jsonify({"error": "Database query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+
 @app.route('/debug/player/<username>', methods=['GET'])
 def debug_player_status(username):
     """
     A debug endpoint to check the raw data from the database.
     This bypasses the front-end logic and shows what the Flask app is receiving.
     """
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    cursor = conn.cursor(dictionary=True)
-    debug_info = {}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        debug_info = {}
+        try:
+            # Check the 'players' table
+            cursor.execute(PLAYER_FLAGS_SQL, {"username": username})
+            players_table_status = cursor.fetchone()
+            debug_info['players_table_status'] = (rows_as_dicts(cursor, [players_table_status])[0]
+                                                  if players_table_status else None)
+
+            # Check the 'punishments' table for active punishments
+            now = datetime.now()
+            cursor.execute(ACTIVE_PUNISHMENTS_SQL, {"username": username, "now": now})
+            debug_info['active_punishments'] = rows_as_dicts(cursor, cursor.fetchall())
+            debug_info['now'] = now
+
+            return json_response(debug_info)
+
+        except mysql.connector.Error as err:
+            return jsonify({"error": "Debug query failed", "details": str(err)}), 500
+        finally:
+            cursor.close()
+
+@app.cli.command("check-plans")
+@click.option("--username", help="Player to EXPLAIN the queries for (default: any player)")
+def check_plans(username):
+    """
+    Runs EXPLAIN on every query in API_QUERIES and fails if any table is read with
+    a full scan or rows are sorted with a filesort. Run it against a database with
+    realistic data: on near-empty tables the optimizer may prefer a scan.
+
+        flask --app app check-plans
+    """
     try:
-        # Check the 'players' table
-        cursor.execute("SELECT is_banned, is_muted FROM players WHERE username = %s", (username,))
-        players_table_status = cursor.fetchone()
-        debug_info['players_table_status'] = players_table_status
-
-        # Check the 'punishments' table for active punishments
-        now = datetime.now()
-        cursor.execute("""
-            SELECT punishment_type, reason, duration, punishment_timestamp, expires_at
-            FROM punishments
-            WHERE username = %s AND (expires_at IS NULL OR expires_at > %s)
-            ORDER BY punishment_timestamp DESC
-        """, (username, now))
-        active_punishments = cursor.fetchall()
-
-        # Convert datetime objects to string
-        for p in active_punishments:
-            if p.get('punishment_timestamp'):
-                p['punishment_timestamp'] = p['punishment_timestamp'].isoformat()
-            if p.get('expires_at'):
-                p['expires_at'] = p['expires_at'].isoformat()
-
-        debug_info['active_punishments'] = active_punishments
-        debug_info['now'] = now.isoformat()
-
-        return jsonify(debug_info)
-
-    except mysql.connector.Error as err:
-        return jsonify({"error": "Debug query failed", "details": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            problems = []
+            try:
+                if username is None:
+                    cursor.execute("SELECT id, username FROM players LIMIT 1")
+                else:
+                    cursor.execute("SELECT id, username FROM players WHERE username = %(username)s",
+                                   {"username": username})
+                row = cursor.fetchone()
+                if not row:
+                    raise click.ClickException(f"Player {username} not found" if username
+                                               else "No players yet; there is nothing to EXPLAIN")
+                params = {"username": row['username'], "player_id": row['id'], "now": datetime.now(),
+                          "after_id": 0, "q": "gg", "server": None,
+                          "since": None, "limit": SEARCH_PAGE_SIZE + 1, "offset": 0,
+                          # A deep page: the first page (NULL cursor) reads the same index
+                          "before_time": datetime.now(), "before_id": 2 ** 31 - 1,
+                          "until": None, "server_name": "lobby",
+                          "since_day": date.today() - timedelta(days=6)}
+
+                for name, sql in API_QUERIES.items():
+                    cursor.execute("EXPLAIN " + sql, params)
+                    found = len(problems)
+                    for step in cursor.fetchall():
+                        table = step.get('table') or ''
+                        extra = step.get('Extra') or ''
+                        # <derivedN>/<unionM,N> are the query's own temporary results, e.g. the merged kill branches
+                        if table.startswith('<'):
+                            continue
+                        if step.get('type') == 'ALL':
+                            problems.append(f"{name}: full scan of {table}")
+                        # Ranking full-text matches by relevance always sorts them
+                        if 'Using filesort' in extra and step.get('type') != 'fulltext':
+                            problems.append(f"{name}: filesort on {table}")
+                    click.echo(f"{name}: {'FAILED' if len(problems) > found else 'ok'}")
+            finally:
+                cursor.close()
+    except DatabaseUnavailable as err:
+        raise click.ClickException(f"Database connection failed: {err}")
+
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
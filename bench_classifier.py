@@ -0,0 +1,80 @@
+# filename: bench_classifier.py
+#
+# Compares the lines-per-second rate of the old seven-search matching loop
+# against log_parser.classify_line.
+#
+#   python bench_classifier.py                 # synthetic log (mostly noise)
+#   python bench_classifier.py path/to/latest.log
+
+import random
+import re
+import sys
+import time
+
+from log_parser import classify_line
+
+# The patterns exactly as tail_log_file_and_insert_data used them before the classifier.
+legacy_patterns = [
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] \? Banned \? (.+?) has been banned (.+?) for (.+?)\."),
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] \? Muted \? (.+?) has been muted (.+?) for (.+?)\."),
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] \? Report \? (.+?) reported (.+?) for (.+?) in (.+?)\."),
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Server thread/INFO\]: (.+?) swears in (.+?): (.+)"),
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Server thread/INFO\]: (.+?) possibly advertises in (.+?): (.+)"),
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] (.+?) � (.+)"),
+    re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Server thread/INFO\]: (.+?) was killed by (.+)"),
+]
+
+def legacy_classify(line):
+    matches = []
+    for pattern in legacy_patterns:
+        match = pattern.search(line)
+        if match:
+            matches.append(match.groups())
+    return matches
+
+def synthetic_lines(count, seed=42):
+    """
+    Builds a log that looks like a busy lobby: mostly noise, some chat, a few events.
+    """
+    rng = random.Random(seed)
+    templates = [
+        (60, "[{t}] [Client thread/INFO]: Loaded {n} advancements"),
+        (15, "[{t}] [Render thread/WARN]: Missing sound for event: minecraft:item.{n}"),
+        (10, "[{t}] [Client thread/INFO]: [CHAT] Player{n} � gg everyone, that was a close one"),
+        (5, "[{t}] [Client thread/INFO]: [CHAT] [Party] Player{n} joined the party."),
+        (4, "[{t}] [Server thread/INFO]: Player{n} was killed by Player{m}"),
+        (3, "[{t}] [Server thread/INFO]: Player{n} swears in Lobby-{m}: some filtered text"),
+        (1, "[{t}] [Client thread/INFO]: [CHAT] ? Report ? Player{n} reported Player{m} for cheating in Lobby-{m}."),
+        (1, "[{t}] [Client thread/INFO]: [CHAT] ? Muted ? Player{n} has been muted 1h for spam."),
+        (1, "[{t}] [Client thread/INFO]: [CHAT] ? Banned ? Player{n} has been banned 7d for hacking."),
+    ]
+    weights = [w for w, _ in templates]
+    lines = []
+    for i in range(count):
+        template = rng.choices(templates, weights)[0][1]
+        t = f"{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}"
+        lines.append(template.format(t=t, n=rng.randrange(1000), m=rng.randrange(50)))
+    return lines
+
+def measure(label, func, lines, rounds=3):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(lines) / best
+    print(f"{label:<12} {rate:>14,.0f} lines/s  ({best * 1000:.1f} ms for {len(lines):,} lines)")
+    return rate
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8', errors='replace') as f:
+            lines = [line.strip() for line in f if line.strip()]
+    else:
+        lines = synthetic_lines(200_000)
+
+    legacy_rate = measure("legacy", legacy_classify, lines)
+    classifier_rate = measure("classifier", classify_line, lines)
+    print(f"speedup      {classifier_rate / legacy_rate:.2f}x")
@@ -0,0 +1,69 @@
+# filename: bench_serialization.py
+#
+# Compares the rows-per-second rate of the old response path (dictionary cursor
+# rows, an .isoformat() loop per route, Flask's jsonify encoding) against the
+# shared serialization layer in app.py (tuple rows + column names, datetimes
+# formatted by the encoder), with the standard library and, if installed, orjson.
+#
+#   python bench_serialization.py            # 10,000 kill history rows
+#   python bench_serialization.py 100000
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import app
+
+COLUMNS = ('id', 'killer', 'killed', 'timestamp')
+
+def synthetic_rows(count, seed=42):
+    """
+    Builds kill history rows as a plain cursor returns them: tuples with datetimes.
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [(i, f"Player{rng.randrange(1000)}", f"Player{rng.randrange(1000)}",
+             start + timedelta(seconds=i * 7))
+            for i in range(count)]
+
+class FakeCursor:
+    column_names = COLUMNS
+
+def legacy_serialize(rows):
+    # What a dictionary cursor builds, then the per-route loop, then jsonify's json.dumps
+    items = [dict(zip(COLUMNS, row)) for row in rows]
+    for k in items:
+        if k.get('timestamp'):
+            k['timestamp'] = k['timestamp'].isoformat()
+    return json.dumps({"items": items, "next_cursor": None}, sort_keys=True,
+                      separators=(',', ':')).encode()
+
+def layer_serialize(dumps):
+    def serialize(rows):
+        return dumps({"items": app.rows_as_dicts(FakeCursor, rows), "next_cursor": None})
+    return serialize
+
+def measure(label, func, rows, rounds=5):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(rows) / best
+    print(f"{label:<8} {rate:>14,.0f} rows/s  ({best * 1000:.1f} ms for {len(rows):,} rows)")
+    return rate
+
+if __name__ == "__main__":
+    rows = synthetic_rows(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
+
+    legacy_rate = measure("legacy", legacy_serialize, rows)
+    stdlib_rate = measure("stdlib", layer_serialize(app.dumps_stdlib), rows)
+    print(f"speedup  {stdlib_rate / legacy_rate:.2f}x")
+    if app.orjson is not None:
+        orjson_rate = measure("orjson", layer_serialize(app.dumps_orjson), rows)
+        print(f"speedup  {orjson_rate / legacy_rate:.2f}x")
+    else:
+        print("orjson   not installed (pip install orjson)")
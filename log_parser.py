@@ -2,11 +2,39 @@
 
 import os
 import re
+import glob
+import gzip
+import json
+import hashlib
 import mysql.connector
 import logging
 import time
+import threading
+import queue
+import atexit
+import bisect
+import heapq
+import contextlib
+import logging.handlers
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import tempfile
+from collections import OrderedDict
+import sqlite3
+import argparse
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+# Optional: file-change notifications (inotify on Linux, ReadDirectoryChangesW on
+# Windows, FSEvents on macOS). Without it the tailer falls back to polling.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
 # --- Configuration ---
 # Update these with your MySQL connection details
 MYSQL_HOST = "localhost"
@@ -15,19 +43,317 @@ MYSQL_USER = "root"
 MYSQL_PASSWORD = "your_secure_password"
 # The full path to your server log file
 LOG_FILE_PATH = r"C:\Users\xBlur\AppData\Roaming\norisk\NoRiskClientV3\data\profiles\1.8.9\logs\latest.log"
-# The interval (in seconds) to check for new log entries
-POLLING_INTERVAL = 5
+# All log files to follow at once. Each source has a unique name (stored in the `source`
+# column and used for its checkpoint file), a path that may be a glob, and optionally
+# the server_name to tag rows whose log line doesn't name a server. A glob source
+# follows every match, named "<name>/<part of the path the first wildcard matched>".
+LOG_SOURCES = [
+    {"name": "default", "path": LOG_FILE_PATH, "server_name": None},
+    # {"name": "profiles", "path": r"C:\Users\xBlur\AppData\Roaming\norisk\NoRiskClientV3\data\profiles\*\logs\latest.log"},
+]
+# The interval (in seconds) to check for new log entries when file-change
+# notifications are not available (install `watchdog` to get them)
+POLLING_INTERVAL = 0.5
+# With notifications, the file is still re-checked this often in case one is missed
+WATCH_FALLBACK_INTERVAL = 5
+# Bytes read from the log file per read() call
+READ_CHUNK_SIZE = 256 * 1024
+# Where the parser remembers how far it got, so a restart resumes there. Sources
+# other than "default" get log_parser.checkpoint.<source>.json next to it.
+CHECKPOINT_FILE = "log_parser.checkpoint.json"
+# Bytes at the start of a log file hashed to recognise it after a restart or rotation
+FINGERPRINT_BYTES = 1024
+# Rows per chunk when backfilling existing tables during a migration
+MIGRATION_CHUNK_SIZE = 5000
+# Most username -> players.id mappings the writer keeps in memory
+PLAYER_ID_CACHE_SIZE = 100_000
+# Parsed events are written in one transaction once this many are pending...
+BATCH_MAX_ROWS = 500
+# ...or once the oldest pending event has waited this many seconds
+BATCH_MAX_AGE = 0.25
+# A batch that hits a deadlock is retried this many times in total
+DEADLOCK_RETRIES = 3
+ER_LOCK_DEADLOCK = 1213
+# Rows per transaction when backfilling archived logs
+BACKFILL_BATCH_ROWS = 5000
+# Indexes a backfill --drop-indexes dropped and has not rebuilt yet; a later run
+# (backfill or tailer) rebuilds them if the backfill died before it could
+DROPPED_INDEXES_FILE = "log_parser.dropped_indexes.json"
+# Chunks of lines waiting for the parser / chunks of events waiting for the DB writer
+LINE_QUEUE_SIZE = 64
+EVENT_QUEUE_SIZE = 64
+# Parsed events are first written to this on-disk spool (SQLite in WAL mode); the
+# source checkpoints advance once events are spooled, and a drainer thread moves
+# them to MySQL. Tailing keeps going while MySQL is slow or down.
+SPOOL_FILE = "log_parser.spool.sqlite3"
+# Most events the spool holds; when it is full, reading pauses until MySQL catches up
+SPOOL_MAX_EVENTS = 1_000_000
+# Events moved from the spool to MySQL per transaction
+SPOOL_DRAIN_ROWS = 5000
+# Reconnect delay after MySQL became unreachable, doubled on each failure up to the max
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+# Errors after which a spooled batch is kept and retried instead of dropped:
+# lock wait timeout, deadlock, server gone away, lost connection, not connected
+RETRYABLE_DB_ERRORS = {1205, 1213, 2003, 2006, 2013, 2055}
+# New bans, mutes, reports and kills are also written to the event_feed table, which
+# the API tails for its live event stream. Rows older than this many seconds are pruned.
+EVENT_FEED_RETENTION = 3600
+# Seconds between prunes of event_feed
+EVENT_FEED_PRUNE_INTERVAL = 60
+# Seconds between pipeline stage reports (queue depth and throughput) in the log
+PIPELINE_STATS_INTERVAL = 60
+# A stage blocked on a full queue warns at most this often (seconds)
+BACKPRESSURE_WARNING_INTERVAL = 10
+# Log verbosity: DEBUG traces every line and event (also on the console), INFO is the default.
+# Can be set with the LOG_PARSER_LOG_LEVEL environment variable or --verbose.
+LOG_LEVEL = os.environ.get("LOG_PARSER_LOG_LEVEL", "INFO").upper()
+# Repeated messages (e.g. duplicate skipped) are let through at most this many times per window...
+LOG_RATE_LIMIT_BURST = 10
+# ...of this many seconds; the rest are counted and summarised
+LOG_RATE_LIMIT_WINDOW = 10
+# Local HTTP endpoint serving /metrics in Prometheus text format (port 0 disables it)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+# Also write a metrics summary to the log with every pipeline report
+METRICS_LOG_SUMMARY = True
 
 # --- Logging Setup ---
-# Configure logging to write to a file, so you can check it for errors later.
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='log_parser.log',
-    filemode='a'
-)
+# Log records are handed to a QueueHandler and written by a QueueListener thread, so
+# the parsing threads never wait for the disk or the console. Hot-path messages are
+# logged at DEBUG, which is off by default; check DEBUG_LOGGING before building them.
+
+# Pass as extra= to let a repeated message through only LOG_RATE_LIMIT_BURST times per window
+RATE_LIMITED = {'rate_limited': True}
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops records marked rate_limited once the same message template has been
+    logged LOG_RATE_LIMIT_BURST times in the current window. The next record of
+    that template that gets through says how many were suppressed.
+    """
+
+    def __init__(self, burst=LOG_RATE_LIMIT_BURST, window=LOG_RATE_LIMIT_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.lock = threading.Lock()
+        # template -> [window start, records let through, records suppressed]
+        self.counters = {}
+
+    def filter(self, record):
+        if not getattr(record, 'rate_limited', False):
+            return True
+        now = time.monotonic()
+        with self.lock:
+            counter = self.counters.setdefault(record.msg, [now, 0, 0])
+            if now - counter[0] >= self.window:
+                suppressed = counter[2]
+                counter[:] = [now, 0, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+            if counter[1] >= self.burst:
+                counter[2] += 1
+                return False
+            counter[1] += 1
+            return True
+
+class DebugOnlyFilter(logging.Filter):
+    # INFO and above already reach the console through print()
+    def filter(self, record):
+        return record.levelno == logging.DEBUG
+
+DEBUG_LOGGING = False
+log_queue = queue.SimpleQueue()
+log_file_handler = logging.FileHandler('log_parser.log', mode='a', encoding='utf-8')
+log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(threadName)s - %(message)s'))
+log_console_handler = logging.StreamHandler()
+log_console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+log_console_handler.addFilter(DebugOnlyFilter())
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler, log_console_handler,
+                                              respect_handler_level=True)
+
+def set_log_level(level):
+    """
+    Sets the verbosity. DEBUG also turns on per-line traces on the console.
+    """
+    global DEBUG_LOGGING
+    level = logging.getLevelName(level) if isinstance(level, str) else level
+    logging.getLogger().setLevel(level)
+    DEBUG_LOGGING = level <= logging.DEBUG
+    log_console_handler.setLevel(logging.DEBUG if DEBUG_LOGGING else logging.CRITICAL + 1)
+
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.addFilter(RateLimitFilter())
+logging.getLogger().addHandler(queue_handler)
+set_log_level(LOG_LEVEL)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.info("--- Starting new session ---")
 
+# --- Metrics ---
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    """
+    Thread-safe counters, latency histograms and computed gauges, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptions = {}
+        # (name, labels) -> value for counters
+        self.counters = {}
+        # (name, labels) -> [count per bucket..., sum, count] for histograms
+        self.histograms = {}
+        # name -> function returning the current value, None to omit it, or a
+        # list of (labels dict, value) pairs
+        self.gauges = {}
+
+    def describe(self, name, kind, help_text):
+        self.descriptions[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+            bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+            if bucket < len(LATENCY_BUCKETS):
+                histogram[bucket] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def set_gauge(self, name, func):
+        self.gauges[name] = func
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text format.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: list(value) for key, value in self.histograms.items()}
+
+        samples = {}
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append((name, labels, value))
+        for (name, labels), histogram in histograms.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram):
+                cumulative += count
+                samples.setdefault(name, []).append((name + "_bucket", labels + (('le', repr(bound)),), cumulative))
+            samples[name].append((name + "_bucket", labels + (('le', '+Inf'),), histogram[-1]))
+            samples[name].append((name + "_sum", labels, histogram[-2]))
+            samples[name].append((name + "_count", labels, histogram[-1]))
+        for name, func in self.gauges.items():
+            for labels, value in self._gauge_values(name, func):
+                samples.setdefault(name, []).append((name, labels, value))
+
+        lines = []
+        for name in sorted(samples):
+            kind, help_text = self.descriptions.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples[name]:
+                label_text = ",".join(f'{key}="{value_}"' for key, value_ in labels)
+                lines.append(f"{sample_name}{{{label_text}}} {value}" if label_text else f"{sample_name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Returns a one-line summary of the counters and mean latencies for the log.
+        """
+        with self.lock:
+            parts = [f"{name}{dict(labels) if labels else ''}={value}" for (name, labels), value in sorted(self.counters.items())]
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if histogram[-1]:
+                    mean_ms = histogram[-2] / histogram[-1] * 1000
+                    parts.append(f"{name}{dict(labels) if labels else ''} mean={mean_ms:.1f}ms n={histogram[-1]}")
+        for name, func in self.gauges.items():
+            for labels, value in self._gauge_values(name, func):
+                parts.append(f"{name}{dict(labels) if labels else ''}={value:.1f}")
+        return ", ".join(parts)
+
+    def _gauge_values(self, name, func):
+        """
+        Calls a gauge function, which returns a value, None (no sample) or a list
+        of (labels dict, value) pairs. Yields (labels tuple, value) pairs.
+        """
+        try:
+            value = func()
+        except Exception as e:
+            logging.warning("Could not compute metric %s: %s", name, e, extra=RATE_LIMITED)
+            return
+        if value is None:
+            return
+        if isinstance(value, list):
+            for labels, labelled_value in value:
+                yield tuple(sorted(labels.items())), labelled_value
+        else:
+            yield (), value
+
+metrics = Metrics()
+metrics.describe("log_parser_lines_read_total", "counter", "Log lines read")
+metrics.describe("log_parser_matches_total", "counter", "Lines matched, per event type")
+metrics.describe("log_parser_rows_inserted_total", "counter", "New rows written, per table")
+metrics.describe("log_parser_duplicates_skipped_total", "counter", "Events skipped as duplicates, per table")
+metrics.describe("log_parser_db_statement_seconds", "histogram", "Latency of the statements of a batch flush")
+metrics.describe("log_parser_commit_seconds", "histogram", "Latency of batch commits")
+metrics.describe("log_parser_lag_bytes", "gauge", "Bytes of the log file not yet spooled")
+metrics.describe("log_parser_expired_punishments_total", "counter", "Temporary bans and mutes whose flags were cleared on expiry")
+metrics.describe("log_parser_spool_events", "gauge", "Events in the on-disk spool waiting for MySQL")
+metrics.describe("log_parser_lag_seconds", "gauge", "Seconds since the newest committed log timestamp")
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a log line each
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Serves /metrics from a background thread. Returns the server, or None if disabled.
+    """
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    except OSError as err:
+        logging.error(f"Could not start the metrics endpoint on {host}:{port}: {err}")
+        print(f"Could not start the metrics endpoint on {host}:{port}: {err}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
 # --- Database Functions ---
 
 def create_database(db_config):
@@ -56,16 +382,17 @@ def create_database(db_config):
         return False
     return True
 
-def get_db_connection():
+def get_db_connection(allow_local_infile=False):
     """
     Establishes a database connection. If the 'minecraft_logs' database does not exist,
-    it attempts to create it first.
+    it attempts to create it first. allow_local_infile enables LOAD DATA LOCAL INFILE.
     """
     db_config = {
         "host": MYSQL_HOST,
         "user": MYSQL_USER,
         "password": MYSQL_PASSWORD,
-        "database": "minecraft_logs"
+        "database": "minecraft_logs",
+        "allow_local_infile": allow_local_infile
     }
     try:
         conn = mysql.connector.connect(**db_config)
@@ -96,10 +423,11 @@ def get_db_connection():
 
 def create_tables(conn):
     """
-    Creates all necessary tables that match the Flask API expectations.
+    Migration 1: creates all necessary tables that match the Flask API expectations.
+    Existing deployments already have them; later migrations bring those up to date.
     """
+    cursor = conn.cursor()
     try:
-        cursor = conn.cursor()
         logging.info("Checking and creating tables...")
         print("Checking and creating tables...")
 
@@ -119,51 +447,71 @@ def create_tables(conn):
             "chat_messages": """
                 CREATE TABLE IF NOT EXISTS chat_messages (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255),
+                    player_id INT,
                     message TEXT,
                     message_type ENUM('normal', 'swear_filtered', 'advertise_filtered') DEFAULT 'normal',
                     server_name VARCHAR(255),
                     chat_timestamp DATETIME,
-                    INDEX idx_username (username),
-                    INDEX idx_timestamp (chat_timestamp)
+                    source VARCHAR(255),
+                    content_key CHAR(40),
+                    INDEX idx_player_time (player_id, chat_timestamp),
+                    INDEX idx_timestamp (chat_timestamp),
+                    UNIQUE KEY uq_content_key (content_key),
+                    CONSTRAINT fk_chat_messages_player_id FOREIGN KEY (player_id) REFERENCES players (id)
                 )
             """,
             "punishments": """
                 CREATE TABLE IF NOT EXISTS punishments (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255),
+                    player_id INT,
                     punishment_type ENUM('Ban', 'Mute'),
                     duration VARCHAR(255),
                     reason TEXT,
                     moderator_name VARCHAR(255),
                     punishment_timestamp DATETIME,
                     expires_at DATETIME,
-                    INDEX idx_username (username),
-                    INDEX idx_timestamp (punishment_timestamp)
+                    server_name VARCHAR(255),
+                    source VARCHAR(255),
+                    content_key CHAR(40),
+                    INDEX idx_player_time (player_id, punishment_timestamp),
+                    INDEX idx_timestamp (punishment_timestamp),
+                    UNIQUE KEY uq_content_key (content_key),
+                    CONSTRAINT fk_punishments_player_id FOREIGN KEY (player_id) REFERENCES players (id)
                 )
             """,
             "reports": """
                 CREATE TABLE IF NOT EXISTS reports (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    reporter_name VARCHAR(255),
-                    reported_name VARCHAR(255),
+                    reporter_id INT,
+                    reported_id INT,
                     reason TEXT,
                     server_name VARCHAR(255),
                     report_timestamp DATETIME,
-                    INDEX idx_reporter (reporter_name),
-                    INDEX idx_reported (reported_name),
-                    INDEX idx_timestamp (report_timestamp)
+                    source VARCHAR(255),
+                    content_key CHAR(40),
+                    INDEX idx_reporter_time (reporter_id, report_timestamp),
+                    INDEX idx_reported_time (reported_id, report_timestamp),
+                    INDEX idx_timestamp (report_timestamp),
+                    UNIQUE KEY uq_content_key (content_key),
+                    CONSTRAINT fk_reports_reporter_id FOREIGN KEY (reporter_id) REFERENCES players (id),
+                    CONSTRAINT fk_reports_reported_id FOREIGN KEY (reported_id) REFERENCES players (id)
                 )
             """,
             "kill_events": """
                 CREATE TABLE IF NOT EXISTS kill_events (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    killer VARCHAR(255),
-                    killed VARCHAR(255),
+                    killer_id INT,
+                    killed_id INT,
                     timestamp DATETIME,
-                    INDEX idx_killer (killer),
-                    INDEX idx_killed (killed),
-                    INDEX idx_timestamp (timestamp)
+                    server_name VARCHAR(255),
+                    source VARCHAR(255),
+                    content_key CHAR(40),
+                    INDEX idx_killer_time (killer_id, timestamp),
+                    INDEX idx_killed_time (killed_id, timestamp),
+                    INDEX idx_timestamp (timestamp),
+                    UNIQUE KEY uq_content_key (content_key),
+                    CONSTRAINT fk_kill_events_killer_id FOREIGN KEY (killer_id) REFERENCES players (id),
+                    CONSTRAINT fk_kill_events_killed_id FOREIGN KEY (killed_id) REFERENCES players (id)
                 )
             """
         }
@@ -174,62 +522,527 @@ def create_tables(conn):
             print(f"Table '{table_name}' checked/created successfully.")
         
         conn.commit()
+    finally:
         cursor.close()
-    except mysql.connector.Error as err:
-        logging.error(f"Error creating tables: {err}")
-        print(f"Error creating tables: {err}")
 
-def update_player_status(conn, username):
+def table_columns(cursor, table):
     """
-    Updates or inserts a player in the players table and updates their status.
+    Returns the set of column names of a table.
+    """
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+def migrate_content_keys(conn):
+    """
+    One-off migration for tables created before events carried a content key.
+    Adds the content_key column and its UNIQUE index where missing, then backfills
+    the key for existing rows. Rows whose key is already taken are exact duplicates
+    of an earlier row and are deleted.
     """
     cursor = conn.cursor()
-    now = datetime.now()
-    
     try:
-        # Check if player exists
-        cursor.execute("SELECT id, first_seen FROM players WHERE username = %s", (username,))
-        player = cursor.fetchone()
-        cursor.fetchall()  # Consume any remaining results
-        
-        if player:
-            # Update existing player
+        for table, columns in DEDUP_COLUMNS.items():
+            present = table_columns(cursor, table)
+            if not present.issuperset(columns):
+                continue  # Usernames already replaced by player ids, so keys were backfilled before that
+            if 'content_key' not in present:
+                logging.info(f"Adding content_key to '{table}'...")
+                print(f"Adding content_key to '{table}'...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN content_key CHAR(40), ADD UNIQUE KEY uq_content_key (content_key)")
+
+            backfilled = 0
+            last_id = 0
+            while True:
+                cursor.execute(f"""
+                    SELECT id, {', '.join(columns)} FROM {table}
+                    WHERE content_key IS NULL AND id > %s
+                    ORDER BY id
+                    LIMIT {MIGRATION_CHUNK_SIZE}
+                """, (last_id,))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                updates = [(compute_content_key(table, dict(zip(columns, row[1:]))), row[0]) for row in rows]
+                # IGNORE leaves the key NULL when an earlier row already holds it
+                cursor.executemany(f"UPDATE IGNORE {table} SET content_key = %s WHERE id = %s", updates)
+                conn.commit()
+                backfilled += len(rows)
+                last_id = rows[-1][0]
+
+            if backfilled:
+                cursor.execute(f"DELETE FROM {table} WHERE content_key IS NULL")
+                duplicates = cursor.rowcount
+                conn.commit()
+                logging.info(f"Backfilled content_key for {backfilled} rows in '{table}', removed {duplicates} duplicates.")
+                print(f"Backfilled content_key for {backfilled} rows in '{table}', removed {duplicates} duplicates.")
+    finally:
+        cursor.close()
+
+def migrate_source_columns(conn):
+    """
+    Adds the `source` tag (and `server_name` where the table had none) to event
+    tables created before the parser followed several log files.
+    """
+    cursor = conn.cursor()
+    try:
+        for table in DEDUP_COLUMNS:
             cursor.execute("""
-                UPDATE players 
-                SET last_seen = %s 
-                WHERE username = %s
-            """, (now, username))
-        else:
-            # Insert new player
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME IN ('server_name', 'source')
+            """, (table,))
+            present = {row[0] for row in cursor.fetchall()}
+            for column in ('server_name', 'source'):
+                if column not in present:
+                    logging.info(f"Adding {column} to '{table}'...")
+                    print(f"Adding {column} to '{table}'...")
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR(255)")
+        conn.commit()
+    finally:
+        cursor.close()
+
+def migrate_player_ids(conn):
+    """
+    One-off migration for event tables that still store usernames: adds the integer
+    player id columns, fills them from players (creating missing players), then
+    drops the username columns and their indexes in favour of indexed foreign keys.
+    Each table is converted in one ALTER at the end, so an interrupted run resumes.
+    """
+    cursor = conn.cursor()
+    try:
+        for table, name_columns in PLAYER_COLUMNS.items():
+            present = table_columns(cursor, table)
+            legacy = [name for name in name_columns if name in present]
+            if not legacy:
+                continue
+            logging.info(f"Converting {', '.join(legacy)} in '{table}' to player ids...")
+            print(f"Converting {', '.join(legacy)} in '{table}' to player ids...")
+            time_column = TIMESTAMP_COLUMNS[table]
+            for name in legacy:
+                id_column = name_columns[name]
+                if id_column not in present:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {id_column} INT")
+                cursor.execute(f"""
+                    INSERT IGNORE INTO players (username, first_seen, last_seen)
+                    SELECT {name}, MIN({time_column}), MAX({time_column}) FROM {table}
+                    WHERE {name} IS NOT NULL GROUP BY {name}
+                """)
+                conn.commit()
+
+                last_id = 0
+                while True:
+                    cursor.execute(f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT {MIGRATION_CHUNK_SIZE}) AS chunk", (last_id,))
+                    chunk_end = cursor.fetchone()[0]
+                    if chunk_end is None:
+                        break
+                    cursor.execute(f"""
+                        UPDATE {table} t JOIN players p ON p.username = t.{name}
+                        SET t.{id_column} = p.id
+                        WHERE t.id > %s AND t.id <= %s
+                    """, (last_id, chunk_end))
+                    conn.commit()
+                    last_id = chunk_end
+
             cursor.execute("""
-                INSERT INTO players (username, first_seen, last_seen, is_banned, is_muted) 
-                VALUES (%s, %s, %s, FALSE, FALSE)
-            """, (username, now, now))
-        
-        # Update ban/mute status based on active punishments
+                SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME IN ({})
+            """.format(", ".join(["%s"] * len(legacy))), (table, *legacy))
+            alterations = [f"DROP INDEX {row[0]}" for row in cursor.fetchall()]
+            alterations += [f"DROP COLUMN {name}" for name in legacy]
+            for name in legacy:
+                id_column = name_columns[name]
+                alterations.append(f"ADD INDEX idx_{id_column} ({id_column})")
+                alterations.append(f"ADD CONSTRAINT fk_{table}_{id_column} FOREIGN KEY ({id_column}) REFERENCES players (id)")
+            cursor.execute(f"ALTER TABLE {table} {', '.join(alterations)}")
+            conn.commit()
+            logging.info(f"'{table}' now references players by id.")
+            print(f"'{table}' now references players by id.")
+    finally:
+        cursor.close()
+
+# (table, index, columns, single-column index it replaces). Each per-player API
+# query filters on the player id and sorts on the event time, so one index serves both.
+PLAYER_TIMELINE_INDEXES = [
+    ('chat_messages', 'idx_player_time', ('player_id', 'chat_timestamp'), 'idx_player_id'),
+    ('punishments', 'idx_player_time', ('player_id', 'punishment_timestamp'), 'idx_player_id'),
+    ('reports', 'idx_reporter_time', ('reporter_id', 'report_timestamp'), 'idx_reporter_id'),
+    ('reports', 'idx_reported_time', ('reported_id', 'report_timestamp'), 'idx_reported_id'),
+    ('kill_events', 'idx_killer_time', ('killer_id', 'timestamp'), 'idx_killer_id'),
+    ('kill_events', 'idx_killed_time', ('killed_id', 'timestamp'), 'idx_killed_id')
+]
+
+def add_player_timeline_indexes(conn):
+    """
+    Replaces the single-column player id indexes with (player id, event time)
+    indexes, which also back the foreign keys.
+    """
+    cursor = conn.cursor()
+    try:
+        for table, name, columns, replaced in PLAYER_TIMELINE_INDEXES:
+            cursor.execute("""
+                SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME IN (%s, %s)
+            """, (table, name, replaced))
+            present = {row[0] for row in cursor.fetchall()}
+            alterations = []
+            if name not in present:
+                alterations.append(f"ADD INDEX {name} ({', '.join(columns)})")
+            if replaced in present:
+                alterations.append(f"DROP INDEX {replaced}")
+            if alterations:
+                logging.info(f"Indexing {table} ({', '.join(columns)})...")
+                print(f"Indexing {table} ({', '.join(columns)})...")
+                cursor.execute(f"ALTER TABLE {table} {', '.join(alterations)}")
+    finally:
+        cursor.close()
+
+def add_chat_fulltext_index(conn):
+    """
+    Adds a FULLTEXT index on chat messages for the API's chat search.
+    """
+    cursor = conn.cursor()
+    try:
         cursor.execute("""
-            SELECT punishment_type FROM punishments 
-            WHERE username = %s AND (expires_at IS NULL OR expires_at > %s)
-        """, (username, now))
-        
-        active_punishments = cursor.fetchall()
-        is_banned = any(p[0] == 'Ban' for p in active_punishments)
-        is_muted = any(p[0] == 'Mute' for p in active_punishments)
-        
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'chat_messages' AND INDEX_NAME = 'ft_message'
+        """)
+        if not cursor.fetchone()[0]:
+            logging.info("Building the chat message FULLTEXT index, this can take a while...")
+            print("Building the chat message FULLTEXT index, this can take a while...")
+            cursor.execute("ALTER TABLE chat_messages ADD FULLTEXT INDEX ft_message (message)")
+    finally:
+        cursor.close()
+
+def add_player_data_version(conn):
+    """
+    Adds players.data_version, bumped whenever the parser writes anything shown for
+    the player, so the API can tell when its cached responses are stale.
+    """
+    cursor = conn.cursor()
+    try:
         cursor.execute("""
-            UPDATE players 
-            SET is_banned = %s, is_muted = %s 
-            WHERE username = %s
-        """, (is_banned, is_muted, username))
-        
-        conn.commit()
-        
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'players' AND COLUMN_NAME = 'data_version'
+        """)
+        if not cursor.fetchone()[0]:
+            cursor.execute("ALTER TABLE players ADD COLUMN data_version BIGINT UNSIGNED NOT NULL DEFAULT 0")
+    finally:
+        cursor.close()
+
+def add_server_timeline_indexes(conn):
+    """
+    Indexes every event table on (server_name, event time), for the API's
+    per-server export. Each ALTER commits on its own, so tables indexed by an
+    earlier, interrupted run are skipped.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT TABLE_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME = 'idx_server_time'
+        """)
+        indexed = {row[0] for row in cursor.fetchall()}
+        for table, time_column in TIMESTAMP_COLUMNS.items():
+            if table in indexed:
+                continue
+            logging.info(f"Indexing {table} (server_name, {time_column})...")
+            print(f"Indexing {table} (server_name, {time_column})...")
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX idx_server_time (server_name, {time_column})")
+    finally:
+        cursor.close()
+
+def create_event_feed(conn):
+    """
+    Creates event_feed, a short-lived log of new events the API streams to clients.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS event_feed (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                event_type VARCHAR(16) NOT NULL,
+                event_time DATETIME,
+                username VARCHAR(255),
+                other_username VARCHAR(255),
+                server_name VARCHAR(255),
+                duration VARCHAR(255),
+                text TEXT,
+                created_at DATETIME NOT NULL,
+                INDEX idx_created_at (created_at)
+            )
+        """)
+    finally:
+        cursor.close()
+
+# Per-player counters kept in player_stats (all time) and player_stats_daily
+STAT_NAMES = ('kills', 'deaths', 'messages', 'reports_filed', 'reports_received')
+
+# Player id column of each event table, and the counter a new row increments for it
+STAT_COLUMNS = {
+    'kill_events': {'killer_id': 'kills', 'killed_id': 'deaths'},
+    'chat_messages': {'player_id': 'messages'},
+    'reports': {'reporter_id': 'reports_filed', 'reported_id': 'reports_received'}
+}
+
+def create_player_stats(conn):
+    """
+    Creates the player_stats rollup and its daily buckets, and fills both from the
+    events already stored. Counters are set, not added, so a rerun is harmless.
+    """
+    counters = ", ".join(f"{stat} INT UNSIGNED NOT NULL DEFAULT 0" for stat in STAT_NAMES)
+    indexes = ", ".join(f"INDEX idx_{stat} ({stat})" for stat in STAT_NAMES)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS player_stats (
+                player_id INT PRIMARY KEY,
+                {counters},
+                {indexes},
+                CONSTRAINT fk_player_stats_player_id FOREIGN KEY (player_id) REFERENCES players (id)
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS player_stats_daily (
+                player_id INT,
+                day DATE,
+                {counters},
+                PRIMARY KEY (player_id, day),
+                INDEX idx_day (day),
+                CONSTRAINT fk_player_stats_daily_player_id FOREIGN KEY (player_id) REFERENCES players (id)
+            )
+        """)
+        for table, stats in STAT_COLUMNS.items():
+            time_column = TIMESTAMP_COLUMNS[table]
+            for id_column, stat in stats.items():
+                logging.info(f"Counting {stat} from '{table}'...")
+                print(f"Counting {stat} from '{table}'...")
+                cursor.execute(f"""
+                    INSERT INTO player_stats (player_id, {stat})
+                    SELECT {id_column}, COUNT(*) FROM {table} WHERE {id_column} IS NOT NULL GROUP BY {id_column}
+                    ON DUPLICATE KEY UPDATE {stat} = VALUES({stat})
+                """)
+                cursor.execute(f"""
+                    INSERT INTO player_stats_daily (player_id, day, {stat})
+                    SELECT {id_column}, DATE({time_column}), COUNT(*) FROM {table}
+                    WHERE {id_column} IS NOT NULL AND {time_column} IS NOT NULL
+                    GROUP BY {id_column}, DATE({time_column})
+                    ON DUPLICATE KEY UPDATE {stat} = VALUES({stat})
+                """)
+                conn.commit()
+    finally:
+        cursor.close()
+
+# Numbered schema migrations, applied in order by migrate_schema. Never change or
+# renumber a released migration; append a new one. Migrations 1-4 predate the
+# schema_version table and check the schema themselves, so they are no-ops where
+# their change is already in place.
+MIGRATIONS = [
+    (1, "Create tables", create_tables),
+    (2, "Content keys for deduplication", migrate_content_keys),
+    (3, "Source and server_name on event tables", migrate_source_columns),
+    (4, "Integer player id foreign keys", migrate_player_ids),
+    (5, "Player id and event time indexes", add_player_timeline_indexes),
+    (6, "FULLTEXT index on chat messages", add_chat_fulltext_index),
+    (7, "player_stats rollups", create_player_stats),
+    (8, "Per-player data version for API caching", add_player_data_version),
+    (9, "Server name and event time indexes", add_server_timeline_indexes),
+    (10, "Live event feed", create_event_feed)
+]
+
+def migrate_schema(conn):
+    """
+    Brings the database schema up to date by applying the MIGRATIONS newer than
+    the version recorded in schema_version. A named lock keeps two processes
+    from migrating at once. Returns True if the schema is current.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK('minecraft_logs.schema', 300)")
+        if cursor.fetchone()[0] != 1:
+            # 0 after the timeout, NULL on an error: another process may be migrating right now
+            logging.error("Could not take the schema migration lock, not migrating.")
+            print("Could not take the schema migration lock, not migrating.")
+            return False
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                description VARCHAR(255),
+                applied_at DATETIME
+            )
+        """)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = cursor.fetchone()[0]
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            logging.info(f"Applying schema migration {version}: {description}...")
+            print(f"Applying schema migration {version}: {description}...")
+            migrate(conn)
+            cursor.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, %s)",
+                           (version, description, datetime.now()))
+            conn.commit()
+        return True
     except mysql.connector.Error as err:
-        logging.error(f"Error updating player status for {username}: {err}")
-        print(f"DB Error updating player: {err}")
+        logging.error(f"Error migrating the schema: {err}")
+        print(f"Error migrating the schema: {err}")
+        return False
     finally:
+        try:
+            cursor.execute("SELECT RELEASE_LOCK('minecraft_logs.schema')")
+            cursor.fetchone()
+        except mysql.connector.Error:
+            pass
         cursor.close()
 
+def name_key(username):
+    """
+    Returns the key players are matched by. MySQL compares players.username
+    case-insensitively, so "steve" in a report is the stored "Steve".
+    """
+    return username.lower()
+
+def upsert_players(cursor, dirty_players, known):
+    """
+    Writes a batch of player sightings. dirty_players maps name_key(username) ->
+    (username, first_seen, last_seen) within the batch; known maps name_key ->
+    (stored username, id) of the players already stored. New players are inserted
+    with both set; known players get one UPDATE by id that only moves first_seen
+    back (when backfilling older logs) and last_seen forward. Every player in the
+    batch has its data_version bumped, as the batch writes events for each of them.
+
+    Known players are never sent through the upsert: InnoDB uses up an
+    AUTO_INCREMENT value for every row an upsert updates instead of inserting.
+    """
+    # Sorted so concurrent writers lock players rows in the same order
+    new = [dirty_players[key] for key in sorted(dirty_players) if key not in known]
+    if new:
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(new))
+        # Still an upsert, for a player another writer inserted since the lookup
+        cursor.execute(f"""
+            INSERT INTO players (username, first_seen, last_seen)
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE
+                data_version = data_version + 1,
+                first_seen = LEAST(COALESCE(first_seen, VALUES(first_seen)), VALUES(first_seen)),
+                last_seen = GREATEST(COALESCE(last_seen, VALUES(last_seen)), VALUES(last_seen))
+        """, tuple(param for player in new for param in player))
+
+    seen = sorted((known[key][1], first_seen, last_seen)
+                  for key, (_, first_seen, last_seen) in dirty_players.items() if key in known)
+    if seen:
+        # This batch's time of each player, picked by id
+        by_id = "CAST(CASE id " + " ".join(["WHEN %s THEN %s"] * len(seen)) + " END AS DATETIME)"
+        first_seen = [param for player_id, first, _ in seen for param in (player_id, first)]
+        last_seen = [param for player_id, _, last in seen for param in (player_id, last)]
+        ids = [player_id for player_id, _, _ in seen]
+        cursor.execute(f"""
+            UPDATE players
+            SET data_version = data_version + 1,
+                first_seen = COALESCE(LEAST(first_seen, {by_id}), {by_id}),
+                last_seen = COALESCE(GREATEST(last_seen, {by_id}), {by_id})
+            WHERE id IN ({', '.join(['%s'] * len(ids))})
+        """, (*first_seen, *first_seen, *last_seen, *last_seen, *ids))
+
+def add_player_stats(cursor, totals, daily):
+    """
+    Adds a batch's counts to the rollups with one multi-row upsert per table.
+    totals maps player_id -> counts and daily maps (player_id, day) -> counts,
+    counts being a list in STAT_NAMES order.
+    """
+    increments = ", ".join(f"{stat} = {stat} + VALUES({stat})" for stat in STAT_NAMES)
+    # Sorted so concurrent writers lock rows in the same order
+    for table, keys, counts in (('player_stats', ('player_id',), totals),
+                                ('player_stats_daily', ('player_id', 'day'), daily)):
+        if not counts:
+            continue
+        columns = keys + STAT_NAMES
+        placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(counts))
+        params = []
+        for key in sorted(counts):
+            params.extend(key if isinstance(key, tuple) else (key,))
+            params.extend(counts[key])
+        cursor.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE {increments}
+        """, tuple(params))
+
+def refresh_punishment_flags(cursor, usernames, now=None):
+    """
+    Recomputes is_banned/is_muted from active punishments for the given players only.
+    data_version is bumped for players whose flags change.
+    """
+    if not usernames:
+        return
+    now = now or datetime.now()
+    usernames = list(usernames)
+    placeholders = ", ".join(["%s"] * len(usernames))
+    cursor.execute(f"""
+        SELECT pl.username, p.punishment_type
+        FROM players pl JOIN punishments p ON p.player_id = pl.id
+        WHERE pl.username IN ({placeholders}) AND (p.expires_at IS NULL OR p.expires_at > %s)
+    """, (*usernames, now))
+
+    active = {name_key(username): set() for username in usernames}
+    for username, punishment_type in cursor.fetchall():
+        active[name_key(username)].add(punishment_type)
+
+    # One statement for all of them; the flags are whether the name is in the banned/muted lists
+    banned = [key for key, types in active.items() if 'Ban' in types]
+    muted = [key for key, types in active.items() if 'Mute' in types]
+    is_banned = f"(username IN ({', '.join(['%s'] * len(banned))}))" if banned else "FALSE"
+    is_muted = f"(username IN ({', '.join(['%s'] * len(muted))}))" if muted else "FALSE"
+    # SET applies left to right, so the version compares against the old flags
+    cursor.execute(f"""
+        UPDATE players
+        SET data_version = data_version + NOT (is_banned <=> {is_banned} AND is_muted <=> {is_muted}),
+            is_banned = {is_banned}, is_muted = {is_muted}
+        WHERE username IN ({placeholders})
+    """, (*banned, *muted, *banned, *muted, *usernames))
+
+class ExpiryScheduler:
+    """
+    Min-heap of upcoming punishment expiries as (expires_at, username), so a
+    player's is_banned/is_muted flags are cleared when a temporary punishment
+    runs out rather than the next time the player shows up in the log.
+    """
+
+    def __init__(self):
+        self.heap = []
+
+    def load(self, cursor, now=None):
+        """
+        Rebuilds the heap from the punishments still to expire, and recomputes the
+        flags of flagged players, which may have expired while the parser was down.
+        """
+        now = now or datetime.now()
+        cursor.execute("""
+            SELECT p.expires_at, pl.username
+            FROM punishments p JOIN players pl ON pl.id = p.player_id
+            WHERE p.expires_at > %s
+        """, (now,))
+        self.heap = [tuple(row) for row in cursor.fetchall()]
+        heapq.heapify(self.heap)
+        cursor.execute("SELECT username FROM players WHERE is_banned OR is_muted")
+        refresh_punishment_flags(cursor, [row[0] for row in cursor.fetchall()], now)
+
+    def add(self, expires_at, username):
+        # Punishments that are already over were never flagged by refresh_punishment_flags
+        if expires_at > datetime.now():
+            heapq.heappush(self.heap, (expires_at, username))
+
+    def pop_due(self, now=None):
+        """
+        Removes the expiries that have passed and returns their usernames.
+        """
+        now = now or datetime.now()
+        due = set()
+        while self.heap and self.heap[0][0] <= now:
+            due.add(heapq.heappop(self.heap)[1])
+        return due
+
 def parse_duration_to_datetime(duration_str, base_time):
     """
     Parse duration strings like '7d', '1h', '30m', 'permanent' into datetime objects.
@@ -260,294 +1073,1674 @@ def parse_duration_to_datetime(duration_str, base_time):
     
     return None
 
-def check_duplicate_and_insert(conn, table, check_conditions, insert_query, insert_params, log_message):
+# --- Line Classification ---
+# Every log line starts with "[HH:MM:SS] " followed by a fixed thread prefix.
+# Lines are dispatched on that prefix first and then matched (anchored) against
+# the event types registered for it, in registration order. The first hit wins,
+# so more specific patterns must be registered before catch-all ones.
+CLIENT_CHAT_PREFIX = "[Client thread/INFO]: [CHAT] "
+SERVER_PREFIX = "[Server thread/INFO]: "
+
+log_time_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] ")
+
+# Archived logs are named YYYY-MM-DD-N.log.gz by the client
+archived_log_name_pattern = re.compile(r"(\d{4}-\d{2}-\d{2})-\d+\.log(?:\.gz)?$")
+
+def log_date_from_path(path):
     """
-    Helper function to check for duplicates and insert if not exists.
-    Returns True if inserted, False if duplicate found.
+    Returns the YYYY-MM-DD date of an archived log from its file name, or None.
+    """
+    match = archived_log_name_pattern.search(os.path.basename(path))
+    return match.group(1) if match else None
+
+def parse_log_timestamp(log_date_str, log_time_str):
+    """
+    Combines the log date and the HH:MM:SS time of a line into a datetime.
+    """
+    return datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
+
+# --- Event Handlers ---
+# A handler turns the groups of a matched line into (table, row, log_message),
+# where row maps column names to values. Handlers never touch the database;
+# the EventBatcher below writes their rows in batches.
+
+def handle_punishment(punishment_type, timestamp, groups):
+    """
+    Builds a punishments row for a ban or mute.
+    """
+    username, duration, reason = groups
+    row = {
+        'username': username,
+        'punishment_type': punishment_type,
+        'duration': duration,
+        'reason': reason,
+        'punishment_timestamp': timestamp,
+        'expires_at': parse_duration_to_datetime(duration, timestamp),
+        'server_name': None
+    }
+    verb = "banned" if punishment_type == 'Ban' else "muted"
+    return 'punishments', row, f"{username} {verb} for {duration}"
+
+def handle_ban(timestamp, groups):
+    return handle_punishment('Ban', timestamp, groups)
+
+def handle_mute(timestamp, groups):
+    return handle_punishment('Mute', timestamp, groups)
+
+def handle_report(timestamp, groups):
+    """
+    Builds a reports row.
+    """
+    reporter, reported, reason, server = groups
+    row = {
+        'reporter_name': reporter,
+        'reported_name': reported,
+        'reason': reason,
+        'server_name': server,
+        'report_timestamp': timestamp
+    }
+    return 'reports', row, f"{reporter} reported {reported}"
+
+def handle_chat(message_type, timestamp, username, message, server, log_message):
+    """
+    Builds a chat_messages row of the given message type.
+    """
+    row = {
+        'username': username,
+        'message': message,
+        'message_type': message_type,
+        'server_name': server,
+        'chat_timestamp': timestamp
+    }
+    return 'chat_messages', row, log_message
+
+def handle_chat_swear(timestamp, groups):
+    username, server, message = groups
+    return handle_chat('swear_filtered', timestamp, username, message, server, f"swear filtered - {username}")
+
+def handle_chat_advertise(timestamp, groups):
+    username, server, message = groups
+    return handle_chat('advertise_filtered', timestamp, username, message, server, f"advertise filtered - {username}")
+
+def handle_chat_normal(timestamp, groups):
+    username, message = groups
+    return handle_chat('normal', timestamp, username, message, None, f"chat - {username}")
+
+def handle_kill(timestamp, groups):
+    """
+    Builds a kill_events row.
+    """
+    killed, killer = groups  # killed comes first, killer second
+    row = {
+        'killer': killer,
+        'killed': killed,
+        'timestamp': timestamp,
+        'server_name': None
+    }
+    return 'kill_events', row, f"{killer} killed {killed}"
+
+# Registered event types, in match order per prefix: (name, prefix, pattern, handler).
+# The pattern is matched against the text that follows the prefix.
+EVENT_TYPES = []
+# prefix -> [(name, compiled pattern, handler), ...], rebuilt by register_event_type
+EVENT_DISPATCH = {}
+
+def register_event_type(name, prefix, pattern, handler):
+    """
+    Registers a new event type. Lines starting with `prefix` (after the timestamp)
+    are matched against `pattern`; on a hit `handler(timestamp, groups)` is called
+    and must return (table, row, log_message).
+    """
+    compiled = re.compile(pattern)
+    EVENT_TYPES.append((name, prefix, compiled, handler))
+    EVENT_DISPATCH.setdefault(prefix, []).append((name, compiled, handler))
+
+# Ban: "? Banned ? <user> has been banned <duration> for <reason>."
+register_event_type('ban', CLIENT_CHAT_PREFIX, r"\? Banned \? (.+?) has been banned (.+?) for (.+?)\.", handle_ban)
+# Mute: "? Muted ? <user> has been muted <duration> for <reason>."
+register_event_type('mute', CLIENT_CHAT_PREFIX, r"\? Muted \? (.+?) has been muted (.+?) for (.+?)\.", handle_mute)
+# Report: "? Report ? <user> reported <user> for <reason> in <server>."
+register_event_type('report', CLIENT_CHAT_PREFIX, r"\? Report \? (.+?) reported (.+?) for (.+?) in (.+?)\.", handle_report)
+# Normal chat: "<user> » <message>"
+# The » character appears as � due to encoding issues
+register_event_type('chat_normal', CLIENT_CHAT_PREFIX, r"(.+?) � (.+)", handle_chat_normal)
+# Chat filter - swears: "<user> swears in <server>: <message>"
+register_event_type('chat_swear', SERVER_PREFIX, r"(.+?) swears in (.+?): (.+)", handle_chat_swear)
+# Chat filter - advertise: "<user> possibly advertises in <server>: <message>"
+register_event_type('chat_advertise', SERVER_PREFIX, r"(.+?) possibly advertises in (.+?): (.+)", handle_chat_advertise)
+# Kill events: "<user> was killed by <user>"
+register_event_type('kill', SERVER_PREFIX, r"(.+?) was killed by (.+)", handle_kill)
+
+def classify_line(line):
+    """
+    Classifies a single stripped log line.
+    Returns (event_name, log_time_str, groups, handler) for the first matching
+    event type, or None for noise lines.
+    """
+    time_match = log_time_pattern.match(line)
+    if not time_match:
+        return None
+    body_start = time_match.end()
+
+    for prefix, event_types in EVENT_DISPATCH.items():
+        if line.startswith(prefix, body_start):
+            pos = body_start + len(prefix)
+            for name, pattern, handler in event_types:
+                match = pattern.match(line, pos)
+                if match:
+                    return name, time_match.group(1), match.groups(), handler
+            return None
+    return None
+
+# --- Batched Writes ---
+
+# Column order used for the batched INSERT of each event table
+TABLE_COLUMNS = {
+    'punishments': ('player_id', 'punishment_type', 'duration', 'reason', 'punishment_timestamp', 'expires_at', 'server_name', 'source', 'content_key'),
+    'reports': ('reporter_id', 'reported_id', 'reason', 'server_name', 'report_timestamp', 'source', 'content_key'),
+    'chat_messages': ('player_id', 'message', 'message_type', 'server_name', 'chat_timestamp', 'source', 'content_key'),
+    'kill_events': ('killer_id', 'killed_id', 'timestamp', 'server_name', 'source', 'content_key')
+}
+
+# Columns hashed into content_key. The source is deliberately not one of them: two
+# clients in the same lobby log the same event, and it should be stored once.
+DEDUP_COLUMNS = {
+    'punishments': ('username', 'punishment_type', 'punishment_timestamp', 'reason'),
+    'reports': ('reporter_name', 'reported_name', 'report_timestamp', 'reason'),
+    'chat_messages': ('username', 'chat_timestamp', 'message', 'message_type'),
+    'kill_events': ('killer', 'killed', 'timestamp')
+}
+
+# Column holding the event time, used as the players' last_seen
+TIMESTAMP_COLUMNS = {
+    'punishments': 'punishment_timestamp',
+    'reports': 'report_timestamp',
+    'chat_messages': 'chat_timestamp',
+    'kill_events': 'timestamp'
+}
+
+# Row fields holding the usernames whose players row must be updated, and the
+# player id column each one is stored as
+PLAYER_COLUMNS = {
+    'punishments': {'username': 'player_id'},
+    'reports': {'reporter_name': 'reporter_id', 'reported_name': 'reported_id'},
+    'chat_messages': {'username': 'player_id'},
+    'kill_events': {'killer': 'killer_id', 'killed': 'killed_id'}
+}
+
+class PlayerIdCache:
+    """
+    LRU map of name_key(username) -> (stored username, players.id), so a batch
+    only looks up the ids of players it hasn't seen recently. Ids are added after
+    their transaction commits; players rows are never deleted or renamed, so
+    entries never go stale.
+    """
+
+    def __init__(self, max_size=PLAYER_ID_CACHE_SIZE):
+        self.max_size = max_size
+        self.ids = OrderedDict()
+
+    def lookup(self, cursor, usernames):
+        """
+        Returns {name_key(username): (stored username, id)} for the given players,
+        in any casing, with one query for those not in the cache. Players not
+        stored yet are left out. The looked-up ids are not cached yet; pass them
+        to update() once committed.
+        """
+        found = {}
+        missing = []
+        for username in usernames:
+            key = name_key(username)
+            player = self.ids.get(key)
+            if player is None:
+                missing.append(username)
+            else:
+                self.ids.move_to_end(key)
+                found[key] = player
+        if missing:
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(f"SELECT username, id FROM players WHERE username IN ({placeholders})", tuple(missing))
+            for username, player_id in cursor.fetchall():
+                found[name_key(username)] = (username, player_id)
+        return found
+
+    def update(self, ids):
+        for key, player in ids.items():
+            self.ids[key] = player
+            self.ids.move_to_end(key)
+        while len(self.ids) > self.max_size:
+            self.ids.popitem(last=False)
+
+player_ids = PlayerIdCache()
+
+# Columns of event_feed written for each new event, in FEED_COLUMNS order
+FEED_COLUMNS = ('event_type', 'event_time', 'username', 'other_username', 'server_name', 'duration', 'text', 'created_at')
+
+def feed_row(table, row, created_at):
+    """
+    Returns the event_feed values of a new row, or None if its table isn't fed.
+    Punishments are fed as their type in lower case ('ban', 'mute').
+    """
+    if table == 'punishments':
+        return (row['punishment_type'].lower(), row['punishment_timestamp'], row['username'], None,
+                row['server_name'], row['duration'], row['reason'], created_at)
+    if table == 'reports':
+        return ('report', row['report_timestamp'], row['reporter_name'], row['reported_name'],
+                row['server_name'], None, row['reason'], created_at)
+    if table == 'kill_events':
+        return ('kill', row['timestamp'], row['killer'], row['killed'], row['server_name'], None, None, created_at)
+    return None
+
+def prune_event_feed(cursor, now=None):
+    """
+    Deletes the event_feed rows older than EVENT_FEED_RETENTION.
+    """
+    now = now or datetime.now()
+    cursor.execute("DELETE FROM event_feed WHERE created_at < %s",
+                   (now - timedelta(seconds=EVENT_FEED_RETENTION),))
+
+def compute_content_key(table, row):
+    """
+    Returns the deterministic content key of a row: the SHA-1 hex digest of the
+    table name and the row's DEDUP_COLUMNS values. The same event always gets the
+    same key, so the UNIQUE index on content_key rejects re-parsed lines.
+    """
+    parts = [table]
+    for col in DEDUP_COLUMNS[table]:
+        value = row[col]
+        if isinstance(value, datetime):
+            value = value.strftime("%Y-%m-%d %H:%M:%S")
+        parts.append("" if value is None else str(value))
+    return hashlib.sha1("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+def build_insert_query(table):
+    """
+    Returns the INSERT IGNORE statement for a batch of rows; rows whose
+    content_key already exists are skipped by the database.
+    """
+    columns = TABLE_COLUMNS[table]
+    placeholders = ", ".join(["%s"] * len(columns))
+    return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+class EventBatcher:
+    """
+    Collects parsed events into per-table batches and writes each batch with
+    executemany inside a single transaction, together with one coalesced upsert
+    of every player seen in the batch. A flush happens when max_rows events
+    are pending or the oldest pending event is older than max_age seconds.
+
+    Readers report their input position with mark(position, key), one key per
+    source; once everything read up to a position is committed,
+    on_commit(key, position) is called with it.
+
+    With publish_feed, new bans, mutes, reports and kills also go to event_feed
+    in the same transaction. Backfills leave it off: old events aren't news.
+    """
+
+    def __init__(self, conn, max_rows=BATCH_MAX_ROWS, max_age=BATCH_MAX_AGE, on_commit=None, publish_feed=False):
+        self.conn = conn
+        self.publish_feed = publish_feed
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.on_commit = on_commit
+        self.pending = {}
+        self.pending_count = 0
+        self.oldest_pending = None
+        self.positions = {}
+        self.committed_positions = {}
+        # Newest event time committed so far, for the lag metric
+        self.newest_event_time = None
+        # Error of the last failed flush
+        self.last_error = None
+        # Batches, and the events in them, lost to failed flushes
+        self.failed_batches = 0
+        self.failed_rows = 0
+        # (expires_at, username) of the temporary punishments written by the last flush
+        self.expiries = []
+        # name_key -> (stored username, id) of the players referenced by the last flush
+        self.player_ids = {}
+        # table -> (rows inserted, duplicates skipped) of the last flush
+        self.row_counts = {}
+
+    def mark(self, position, key=None):
+        """
+        Records the input position of a source, reached after all of its events
+        before it were added.
+        """
+        self.positions[key] = position
+
+    def add(self, table, row, log_message):
+        if not self.pending_count:
+            self.oldest_pending = time.monotonic()
+        self.pending.setdefault(table, []).append((row, log_message))
+        self.pending_count += 1
+        if self.pending_count >= self.max_rows:
+            self.flush()
+
+    def flush_if_due(self):
+        if self.pending_count and time.monotonic() - self.oldest_pending >= self.max_age:
+            self.flush()
+
+    def time_until_due(self):
+        """
+        Seconds until the pending batch must be flushed, or None if nothing is pending.
+        """
+        if not self.pending_count:
+            return None
+        return max(0.0, self.oldest_pending + self.max_age - time.monotonic())
+
+    def flush(self):
+        """
+        Writes all pending events in one transaction.
+        Returns True on success; on a database error the batch is rolled back and dropped.
+        """
+        positions = dict(self.positions)
+        if not self.pending_count:
+            self._committed(positions)
+            return True
+
+        batch = self.pending
+        self.pending = {}
+        self.pending_count = 0
+        self.oldest_pending = None
+
+        for attempt in range(1, DEADLOCK_RETRIES + 1):
+            cursor = self.conn.cursor()
+            try:
+                newest = self._write_batch(cursor, batch)
+                with metrics.timer("log_parser_commit_seconds"):
+                    self.conn.commit()
+                player_ids.update(self.player_ids)
+                for table, (inserted, duplicates) in self.row_counts.items():
+                    metrics.inc("log_parser_rows_inserted_total", inserted, table=table)
+                    if duplicates:
+                        metrics.inc("log_parser_duplicates_skipped_total", duplicates, table=table)
+                if newest and (self.newest_event_time is None or newest > self.newest_event_time):
+                    self.newest_event_time = newest
+                self._committed(positions)
+                return True
+
+            except mysql.connector.Error as err:
+                self.conn.rollback()
+                # Concurrent writers (e.g. backfill workers) can deadlock on shared players rows
+                if err.errno == ER_LOCK_DEADLOCK and attempt < DEADLOCK_RETRIES:
+                    logging.warning(f"Deadlock flushing event batch, retrying ({attempt}/{DEADLOCK_RETRIES}).")
+                    continue
+                logging.error("Error flushing event batch: %s", err, extra=RATE_LIMITED)
+                print(f"DB Error flushing batch: {err}")
+                self.last_error = err
+                self.failed_batches += 1
+                self.failed_rows += sum(len(events) for events in batch.values())
+                return False
+            finally:
+                cursor.close()
+
+    def _write_batch(self, cursor, batch):
+        """
+        Upserts the players of a batch and inserts its new rows with their player
+        ids, without committing. Returns the newest event time among the new rows.
+        """
+        # name_key -> (username, earliest, latest event timestamp), written as one upsert per batch
+        dirty_players = {}
+        punished = set()
+        self.expiries = []
+        newest = None
+        new_rows = {}
+        for table, events in batch.items():
+            keyed = {}
+            for row, log_message in events:
+                # Kept on a deadlock retry, when the names already have their stored spelling
+                if 'content_key' not in row:
+                    row['content_key'] = compute_content_key(table, row)
+                if row['content_key'] in keyed:
+                    if DEBUG_LOGGING:
+                        logging.debug("Duplicate %s entry skipped - %s", table, log_message, extra=RATE_LIMITED)
+                    continue
+                keyed[row['content_key']] = (row, log_message)
+
+            with metrics.timer("log_parser_db_statement_seconds", statement="dedup_probe"):
+                existing = self._existing_keys(cursor, table, list(keyed))
+            table_rows = new_rows[table] = []
+            for key, (row, log_message) in keyed.items():
+                if key in existing:
+                    if DEBUG_LOGGING:
+                        logging.debug("Duplicate %s entry skipped - %s", table, log_message, extra=RATE_LIMITED)
+                    continue
+                table_rows.append(row)
+                seen_at = row[TIMESTAMP_COLUMNS[table]]
+                if newest is None or seen_at > newest:
+                    newest = seen_at
+                for col in PLAYER_COLUMNS[table]:
+                    key = name_key(row[col])
+                    username, first_seen, last_seen = dirty_players.get(key, (row[col], seen_at, seen_at))
+                    dirty_players[key] = (username, min(first_seen, seen_at), max(last_seen, seen_at))
+                if table == 'punishments':
+                    punished.add(row['username'])
+                    if row['expires_at'] is not None:
+                        self.expiries.append((row['expires_at'], row['username']))
+                if DEBUG_LOGGING:
+                    logging.debug("Inserted %s: %s", table.upper(), log_message)
+
+
+        # Players first, so every row can reference its players by id
+        with metrics.timer("log_parser_db_statement_seconds", statement="player_ids"):
+            self.player_ids = player_ids.lookup(cursor, [player[0] for player in dirty_players.values()])
+        with metrics.timer("log_parser_db_statement_seconds", statement="player_upsert"):
+            upsert_players(cursor, dirty_players, self.player_ids)
+        new_players = [player[0] for key, player in dirty_players.items() if key not in self.player_ids]
+        if new_players:
+            with metrics.timer("log_parser_db_statement_seconds", statement="player_ids"):
+                self.player_ids.update(player_ids.lookup(cursor, new_players))
+        # player_id -> counts and (player_id, day) -> counts, in STAT_NAMES order
+        totals = {}
+        daily = {}
+        for table, rows in new_rows.items():
+            if not rows:
+                continue
+            id_columns = PLAYER_COLUMNS[table].items()
+            stat_columns = [(id_column, STAT_NAMES.index(stat)) for id_column, stat in STAT_COLUMNS.get(table, {}).items()]
+            values = []
+            for row in rows:
+                for name_column, id_column in id_columns:
+                    # The stored spelling from here on, e.g. in event_feed
+                    row[name_column], row[id_column] = self.player_ids[name_key(row[name_column])]
+                values.append(tuple(row[col] for col in TABLE_COLUMNS[table]))
+            with metrics.timer("log_parser_db_statement_seconds", statement="insert"):
+                inserted = self._insert_rows(cursor, table, values)
+            if inserted < len(rows):
+                # A concurrent writer stored some of the keys after the probe and the insert skipped
+                # them. Their rows are newer than the snapshot the probe opened, so reading the keys
+                # again returns only the rows this transaction wrote.
+                with metrics.timer("log_parser_db_statement_seconds", statement="dedup_probe"):
+                    written = self._existing_keys(cursor, table, [row['content_key'] for row in rows])
+                rows[:] = [row for row in rows if row['content_key'] in written]
+            for row in rows:
+                day = row[TIMESTAMP_COLUMNS[table]].date()
+                for id_column, stat in stat_columns:
+                    player_id = row[id_column]
+                    totals.setdefault(player_id, [0] * len(STAT_NAMES))[stat] += 1
+                    daily.setdefault((player_id, day), [0] * len(STAT_NAMES))[stat] += 1
+        # Recorded by flush() once the batch is committed
+        self.row_counts = {table: (len(new_rows[table]), len(events) - len(new_rows[table]))
+                           for table, events in batch.items()}
+        if self.publish_feed:
+            created_at = datetime.now()
+            feed = [feed_row(table, row, created_at) for table, rows in new_rows.items() for row in rows]
+            feed = [values for values in feed if values is not None]
+            if feed:
+                with metrics.timer("log_parser_db_statement_seconds", statement="event_feed"):
+                    cursor.executemany(f"INSERT INTO event_feed ({', '.join(FEED_COLUMNS)}) "
+                                       f"VALUES ({', '.join(['%s'] * len(FEED_COLUMNS))})", feed)
+        # The counts only cover rows this batch inserted, so the rollups stay exact
+        with metrics.timer("log_parser_db_statement_seconds", statement="player_stats"):
+            add_player_stats(cursor, totals, daily)
+        # Only players whose punishments changed in this batch can have new flags
+        if punished:
+            with metrics.timer("log_parser_db_statement_seconds", statement="punishment_flags"):
+                refresh_punishment_flags(cursor, punished)
+        return newest
+
+    def _insert_rows(self, cursor, table, rows):
+        """
+        Inserts the rows, skipping duplicate keys. Returns the number inserted.
+        """
+        cursor.executemany(build_insert_query(table), rows)
+        return cursor.rowcount
+
+    def _committed(self, positions):
+        if not self.on_commit:
+            return
+        for key, position in positions.items():
+            if position is not self.committed_positions.get(key):
+                self.on_commit(key, position)
+                self.committed_positions[key] = position
+
+    def _existing_keys(self, cursor, table, keys):
+        """
+        Returns the subset of keys already stored in the table, using one
+        probe of the content_key UNIQUE index for the whole batch. A plain
+        consistent read, so it takes no locks; under REPEATABLE READ it sees the
+        snapshot of the transaction's first read plus the transaction's own rows.
+        """
+        if not keys:
+            return set()
+        placeholders = ", ".join(["%s"] * len(keys))
+        cursor.execute(f"SELECT content_key FROM {table} WHERE content_key IN ({placeholders})", tuple(keys))
+        return {row[0] for row in cursor.fetchall()}
+
+def tsv_value(value):
+    """
+    Formats one value for LOAD DATA's default TSV dialect.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+class LoadDataBatcher(EventBatcher):
+    """
+    An EventBatcher that writes each table's rows with LOAD DATA LOCAL INFILE from
+    a generated TSV file instead of INSERT statements. Needs a connection opened
+    with allow_local_infile=True and local_infile enabled on the server.
+    """
+
+    def _insert_rows(self, cursor, table, rows):
+        fd, tsv_path = tempfile.mkstemp(suffix=".tsv", prefix=f"backfill_{table}_")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+                for row in rows:
+                    f.write("\t".join(tsv_value(value) for value in row))
+                    f.write("\n")
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {table}
+                CHARACTER SET utf8mb4 ({', '.join(TABLE_COLUMNS[table])})
+            """, (tsv_path,))
+            return cursor.rowcount
+        finally:
+            os.remove(tsv_path)
+
+# --- Log Tailing ---
+
+class LogFileChangeHandler(FileSystemEventHandler):
+    """
+    Sets an event whenever the watched log file is modified, created or moved.
+    """
+
+    def __init__(self, log_file_path, changed):
+        self.file_name = os.path.basename(log_file_path)
+        self.changed = changed
+
+    def on_any_event(self, event):
+        paths = (event.src_path, getattr(event, 'dest_path', ''))
+        if any(os.path.basename(path) == self.file_name for path in paths if path):
+            self.changed.set()
+
+def file_fingerprint(path, length=FINGERPRINT_BYTES):
+    """
+    Returns the SHA-1 of the first `length` bytes of a log file (plain or .gz)
+    and the number of bytes actually hashed.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        head = f.read(length)
+    return hashlib.sha1(head).hexdigest(), len(head)
+
+def load_checkpoint(checkpoint_path):
+    """
+    Returns the saved checkpoint, or None if there is none (or it is unreadable).
     """
-    cursor = conn.cursor()
     try:
-        # Build the duplicate check query
-        where_clause = " AND ".join([f"{col} = %s" for col in check_conditions.keys()])
-        check_query = f"SELECT id FROM {table} WHERE {where_clause}"
-        
-        cursor.execute(check_query, tuple(check_conditions.values()))
-        result = cursor.fetchone()
-        cursor.fetchall()  # Consume any remaining results
-        
-        if result:
-            print(f"LOG: Duplicate {table} entry skipped - {log_message}")
-            return False
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as err:
+        logging.warning(f"Ignoring unreadable checkpoint {checkpoint_path}: {err}")
+        print(f"Ignoring unreadable checkpoint {checkpoint_path}: {err}")
+        return None
+
+def save_checkpoint(checkpoint_path, state):
+    """
+    Atomically replaces the checkpoint file, so a crash leaves either the old
+    or the new checkpoint on disk, never a torn one.
+    """
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+def find_rotated_log(log_file_path, checkpoint):
+    """
+    Looks next to the log file for the archive (YYYY-MM-DD-N.log.gz) the client
+    rotated the checkpointed file into, newest first. Returns its path or None.
+    """
+    directory = os.path.dirname(os.path.abspath(log_file_path))
+    archives = sorted(glob.glob(os.path.join(directory, "*.log.gz")), key=os.path.getmtime, reverse=True)
+    for archive in archives:
+        try:
+            if file_fingerprint(archive, checkpoint['fingerprint_length']) == (checkpoint['fingerprint'], checkpoint['fingerprint_length']):
+                return archive
+        except (OSError, EOFError) as err:
+            logging.warning(f"Could not read archived log {archive}: {err}")
+    return None
+
+class LogReader:
+    """
+    Reads complete lines from one log file (plain or .gz), starting at a byte offset.
+    Large binary chunks are split into lines here and a partial trailing line is
+    carried over to the next read, so the file position is never checked or moved
+    per line.
+    """
+
+    def __init__(self, path, offset=0, chunk_size=READ_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.file = (gzip.open if path.endswith('.gz') else open)(path, 'rb')
+        if offset:
+            self.file.seek(offset)
+        self.read_pos = offset
+        self.partial = b""
+        # Lines only carry a time; archives carry their date in the file name
+        self.log_date = log_date_from_path(path)
+        stat = os.stat(path)
+        self.inode, self.device = stat.st_ino, stat.st_dev
+        self.fingerprint, self.fingerprint_length = file_fingerprint(path)
+
+    @property
+    def position(self):
+        """Byte offset just past the last complete line returned."""
+        return self.read_pos - len(self.partial)
+
+    def read_lines(self):
+        """
+        Returns the complete lines (decoded and stripped) that are available now.
+        An empty list means the reader is at the end of the file.
+        """
+        while True:
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                return []
+            self.read_pos += len(chunk)
+            data = self.partial + chunk
+            lines = data.split(b"\n")
+            self.partial = lines.pop()
+            if lines:
+                return [line.decode('utf-8', errors='replace').strip() for line in lines]
+
+    def finish(self):
+        """
+        Returns the unterminated last line of a file that will not grow any more.
+        """
+        lines = [self.partial.decode('utf-8', errors='replace').strip()] if self.partial else []
+        self.partial = b""
+        return lines
+
+    def checkpoint(self):
+        # A file shorter than FINGERPRINT_BYTES gets a stronger fingerprint as it grows
+        if self.fingerprint_length < FINGERPRINT_BYTES and not self.path.endswith('.gz'):
+            self.fingerprint, self.fingerprint_length = file_fingerprint(self.path)
+        return {
+            'path': self.path,
+            'offset': self.position,
+            'inode': self.inode,
+            'device': self.device,
+            'fingerprint': self.fingerprint,
+            'fingerprint_length': self.fingerprint_length
+        }
+
+    def close(self):
+        self.file.close()
+
+class LogTailer:
+    """
+    Follows a log file across restarts, truncation and rotation.
+
+    On start it resumes from the checkpoint if the file's fingerprint still matches.
+    If the client has rotated the checkpointed file into a dated .log.gz meanwhile,
+    that archive is drained from the checkpointed offset before the new file is read.
+    While running, a replaced (different inode) or truncated file is detected once the
+    old one is fully read. Waiting for new data uses file-change notifications when
+    watchdog is installed, polling otherwise.
+    """
+
+    def __init__(self, log_file_path, checkpoint=None, chunk_size=READ_CHUNK_SIZE):
+        self.log_file_path = log_file_path
+        self.chunk_size = chunk_size
+        self.draining = None
+        self.reader = self._resume(checkpoint)
+        self.changed = threading.Event()
+        self.observer = None
+
+        if Observer is not None:
+            self.observer = Observer()
+            self.observer.schedule(LogFileChangeHandler(log_file_path, self.changed),
+                                   os.path.dirname(os.path.abspath(log_file_path)))
+            self.observer.start()
+            logging.info("Watching the log file for changes.")
         else:
-            cursor.execute(insert_query, insert_params)
-            conn.commit()
-            logging.info(f"Inserted {table.upper()}: {log_message}")
-            print(f"LOG: New {table} - {log_message}")
+            logging.info(f"watchdog is not installed, polling the log file every {POLLING_INTERVAL}s.")
+
+    def _resume(self, checkpoint):
+        """
+        Opens the log file at the checkpointed offset when it is still the same file.
+        """
+        if not checkpoint:
+            return LogReader(self.log_file_path, 0, self.chunk_size)
+
+        offset = checkpoint['offset']
+        fingerprint = file_fingerprint(self.log_file_path, checkpoint['fingerprint_length'])
+        if fingerprint == (checkpoint['fingerprint'], checkpoint['fingerprint_length']):
+            if os.path.getsize(self.log_file_path) >= offset:
+                logging.info(f"Resuming {self.log_file_path} at byte {offset}.")
+                print(f"Resuming {self.log_file_path} at byte {offset}.")
+                return LogReader(self.log_file_path, offset, self.chunk_size)
+            logging.warning(f"{self.log_file_path} was truncated, reading it from the start.")
+            print(f"{self.log_file_path} was truncated, reading it from the start.")
+            return LogReader(self.log_file_path, 0, self.chunk_size)
+
+        archive = find_rotated_log(self.log_file_path, checkpoint)
+        if archive:
+            logging.info(f"Log was rotated to {archive}, finishing it from byte {offset} first.")
+            print(f"Log was rotated to {archive}, finishing it from byte {offset} first.")
+            self.draining = LogReader(archive, offset, self.chunk_size)
+        else:
+            logging.warning("Checkpointed log file not found, reading the current log from the start.")
+            print("Checkpointed log file not found, reading the current log from the start.")
+        return LogReader(self.log_file_path, 0, self.chunk_size)
+
+    def _replaced(self):
+        """
+        True if the path now holds a different (rotated-in) or truncated file.
+        """
+        try:
+            stat = os.stat(self.log_file_path)
+        except FileNotFoundError:
+            return False  # Rotated away and not recreated yet
+        if (stat.st_ino, stat.st_dev) != (self.reader.inode, self.reader.device):
             return True
-            
-    except mysql.connector.Error as err:
-        logging.error(f"Error in check_duplicate_and_insert for {table}: {err}")
-        print(f"DB Error in {table}: {err}")
-        return False
-    finally:
-        cursor.close()
+        return stat.st_size < self.reader.position
+
+    def read_lines(self):
+        """
+        Returns the complete lines that are available now; an empty list means
+        the tailer is caught up.
+        """
+        if self.draining is not None:
+            lines = self.draining.read_lines() or self.draining.finish()
+            if lines:
+                return lines
+            logging.info(f"Finished draining {self.draining.path}.")
+            print(f"Finished draining {self.draining.path}.")
+            self.draining.close()
+            self.draining = None
+
+        lines = self.reader.read_lines()
+        if lines or not self._replaced():
+            return lines
+
+        # The old file is fully read: keep its last unterminated line, then switch
+        lines = self.reader.finish()
+        self.reader.close()
+        logging.info(f"{self.log_file_path} was rotated or truncated, reading the new file.")
+        print(f"{self.log_file_path} was rotated or truncated, reading the new file.")
+        self.reader = LogReader(self.log_file_path, 0, self.chunk_size)
+        return lines or self.reader.read_lines()
+
+    def checkpoint(self):
+        """
+        Returns the state to persist once everything read so far is committed.
+        """
+        return (self.draining or self.reader).checkpoint()
+
+    @property
+    def log_date(self):
+        """The date of the file the last lines came from, or None for the live log."""
+        return (self.draining or self.reader).log_date
+
+    def wait(self):
+        """
+        Blocks until the file has (probably) changed.
+        """
+        if self.observer is None:
+            time.sleep(POLLING_INTERVAL)
+            return
+        self.changed.wait(WATCH_FALLBACK_INTERVAL)
+        self.changed.clear()
+
+    def close(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        if self.draining is not None:
+            self.draining.close()
+        self.reader.close()
+
+class ParsedEvents(list):
+    """
+    Collects (table, row, log_message) events in place of a batcher, so lines can
+    be parsed on a different thread than the one that writes them.
+    """
+
+    def add(self, table, row, log_message):
+        self.append((table, row, log_message))
 
-def tail_log_file_and_insert_data(conn, log_file_path):
+def process_line(line, batcher, log_date_str=None, source=None):
     """
-    Continuously tails the log file, processes new lines, and inserts data into the database.
+    Classifies one stripped line and hands a matched event to the batcher
+    (an EventBatcher or ParsedEvents).
+    log_date_str is the YYYY-MM-DD date of the line; defaults to today.
+    source is the LOG_SOURCES entry the line came from; it tags the row.
     """
+    if not line:
+        return
+
     try:
-        if not os.path.exists(log_file_path):
-            logging.error(f"Log file not found at: {log_file_path}")
-            print(f"Error: Log file not found at: {log_file_path}")
+        event = classify_line(line)
+        if event is None:
+            if DEBUG_LOGGING:
+                logging.debug("No match: %s", line)
             return
 
-        # Regex patterns for parsing log messages
-        # Ban: "? Banned ? <user> has been banned <duration> for <reason>."
-        ban_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] \? Banned \? (.+?) has been banned (.+?) for (.+?)\.")
-        
-        # Mute: "? Muted ? <user> has been muted <duration> for <reason>."
-        mute_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] \? Muted \? (.+?) has been muted (.+?) for (.+?)\.")
-        
-        # Report: "? Report ? <user> reported <user> for <reason> in <server>."
-        report_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] \? Report \? (.+?) reported (.+?) for (.+?) in (.+?)\.")
-        
-        # Chat filter - swears: "<user> swears in <server>: <message>"
-        chat_swear_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Server thread/INFO\]: (.+?) swears in (.+?): (.+)")
-        
-        # Chat filter - advertise: "<user> possibly advertises in <server>: <message>"
-        chat_advertise_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Server thread/INFO\]: (.+?) possibly advertises in (.+?): (.+)")
-        
-        # Normal chat: "<user> » <message>" (also through Client thread/CHAT)  
-        # The » character appears as � due to encoding issues
-        chat_normal_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Client thread/INFO\]: \[CHAT\] (.+?) � (.+)")
-        
-        # Kill events: "<user> was killed by <user>"
-        kill_pattern = re.compile(r"\[(\d{2}:\d{2}:\d{2})\] \[Server thread/INFO\]: (.+?) was killed by (.+)")
+        name, log_time_str, groups, handler = event
+        metrics.inc("log_parser_matches_total", event=name)
+        if DEBUG_LOGGING:
+            logging.debug("Match: %s - %s", name, groups)
+        # The live log only has times, so its lines are dated today
+        log_date_str = log_date_str or datetime.now().strftime("%Y-%m-%d")
+        timestamp = parse_log_timestamp(log_date_str, log_time_str)
+        table, row, log_message = handler(timestamp, groups)
+        row['source'] = source['name'] if source else None
+        if row['server_name'] is None and source:
+            row['server_name'] = source.get('server_name')
+        batcher.add(table, row, log_message)
 
-        logging.info(f"Tailing log file at {log_file_path}...")
-        print(f"Tailing log file at {log_file_path}...")
-        
-        with open(log_file_path, 'r', encoding='utf-8', errors='replace') as f:
-            # For testing: start from beginning to process existing entries
-            # Change to f.seek(0, os.SEEK_END) for production (only new entries)
-            f.seek(0, os.SEEK_SET)  # Start from beginning for testing
-            
-            while True:
-                # Check current position and file size
-                current_pos = f.tell()
-                f.seek(0, os.SEEK_END)
-                file_size = f.tell()
-                
-                if current_pos >= file_size:
-                    # No new data, wait and check again
-                    time.sleep(POLLING_INTERVAL)
+    except Exception as e:
+        logging.error("Error processing line: %s", e, extra=RATE_LIMITED)
+
+# --- Durable Spool ---
+
+# Row columns holding datetimes, restored when events are read back from the spool
+SPOOL_DATETIME_COLUMNS = set(TIMESTAMP_COLUMNS.values()) | {'expires_at'}
+
+def spool_encode(row):
+    return json.dumps({col: value.isoformat() if isinstance(value, datetime) else value
+                       for col, value in row.items()})
+
+def spool_decode(text):
+    row = json.loads(text)
+    for col in SPOOL_DATETIME_COLUMNS.intersection(row):
+        if row[col] is not None:
+            row[col] = datetime.fromisoformat(row[col])
+    return row
+
+class EventSpool:
+    """
+    Bounded, append-only queue of parsed events in an SQLite database in WAL mode.
+    append() returns once the events are on disk (synchronous=FULL), so a source
+    checkpoint saved afterwards never gets ahead of the data. The drainer reads
+    the oldest events with read() and removes them with delete_through() once
+    MySQL has committed them. Events survive a restart and drain on the next run.
+    """
+
+    def __init__(self, path=SPOOL_FILE, max_events=SPOOL_MAX_EVENTS):
+        self.max_events = max_events
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row TEXT NOT NULL,
+                log_message TEXT
+            )
+        """)
+        self.db.commit()
+        # Guards the connection; notified whenever events are added or removed
+        self.changed = threading.Condition()
+        self.count = self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        if self.count:
+            logging.info(f"Spool holds {self.count} events from a previous run.")
+            print(f"Spool holds {self.count} events from a previous run.")
+
+    def append(self, events, stop):
+        """
+        Writes (table, row, log_message) events in one transaction, waiting while
+        the spool is full. Returns False if the pipeline stopped while waiting.
+        """
+        if not events:
+            return True
+        rows = [(table, spool_encode(row), log_message) for table, row, log_message in events]
+        with self.changed:
+            # An oversized chunk is still let into an empty spool
+            while self.count and self.count + len(rows) > self.max_events:
+                if stop.is_set():
+                    return False
+                logging.warning("Spool is full (%d events); reading paused until MySQL catches up.",
+                                self.count, extra=RATE_LIMITED)
+                self.changed.wait(0.5)
+            with self.db:
+                self.db.executemany("INSERT INTO events (table_name, row, log_message) VALUES (?, ?, ?)", rows)
+            self.count += len(rows)
+            self.changed.notify_all()
+        return True
+
+    def read(self, limit):
+        """
+        Returns up to limit of the oldest events as (id, table, row, log_message).
+        """
+        with self.changed:
+            rows = self.db.execute("SELECT id, table_name, row, log_message FROM events ORDER BY id LIMIT ?",
+                                   (limit,)).fetchall()
+        return [(event_id, table, spool_decode(row), log_message) for event_id, table, row, log_message in rows]
+
+    def delete_through(self, last_id):
+        """
+        Removes every event up to and including last_id.
+        """
+        with self.changed:
+            with self.db:
+                deleted = self.db.execute("DELETE FROM events WHERE id <= ?", (last_id,)).rowcount
+            self.count -= deleted
+            self.changed.notify_all()
+
+    def wait(self, timeout):
+        """
+        Waits up to timeout seconds for events, if the spool is empty.
+        """
+        with self.changed:
+            if not self.count:
+                self.changed.wait(timeout)
+
+    def close(self):
+        with self.changed:
+            self.db.close()
+
+# --- Staged Ingest Pipeline ---
+
+class StageStats:
+    """
+    Counters for one pipeline stage: items handled, the depth of the queue it feeds
+    and how long it was blocked because that queue was full (back-pressure).
+    """
+
+    def __init__(self, name, unit, out_queue=None):
+        self.name = name
+        self.unit = unit
+        self.out_queue = out_queue
+        self.items = 0
+        self.blocked_seconds = 0.0
+        self.last_warning = 0.0
+        self.reported_items = 0
+        self.reported_at = time.monotonic()
+
+    def put(self, item, stop):
+        """
+        Puts an item on the stage's output queue, waiting while it is full.
+        Returns False if the pipeline is stopping.
+        """
+        try:
+            self.out_queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        start = time.monotonic()
+        if start - self.last_warning >= BACKPRESSURE_WARNING_INTERVAL:
+            self.last_warning = start
+            logging.warning(f"Back-pressure: {self.name} is waiting, the next stage is falling behind "
+                            f"(queue {self.out_queue.qsize()}/{self.out_queue.maxsize}).")
+        try:
+            while not stop.is_set():
+                try:
+                    self.out_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
                     continue
-                
-                # Go back to where we were and read new lines
-                f.seek(current_pos)
-                line = f.readline()
-                
-                if not line:
-                    time.sleep(POLLING_INTERVAL)
+            return False
+        finally:
+            self.blocked_seconds += time.monotonic() - start
+
+    def report(self):
+        now = time.monotonic()
+        rate = (self.items - self.reported_items) / max(now - self.reported_at, 1e-9)
+        self.reported_items, self.reported_at = self.items, now
+        text = f"{self.name}: {rate:.0f} {self.unit}/s, {self.items} total, blocked {self.blocked_seconds:.1f}s"
+        if self.out_queue is not None:
+            text += f", queue {self.out_queue.qsize()}/{self.out_queue.maxsize}"
+        return text
+
+class IngestPipeline:
+    """
+    Runs ingest as threads connected by bounded queues and an on-disk spool, so
+    reading the files never waits for the database:
+
+        reader per source (LogTailer) -> line queue -> parser -> event queue
+            -> spooler -> EventSpool (SQLite) -> drainer (owns conn) -> MySQL
+
+    All sources share the parser, the spool and the drainer, so another file costs
+    a thread but no extra connection. Each queue item carries its source and the
+    tailer checkpoint reached after its lines; the spooler saves it once those
+    events are in the spool. The drainer moves spooled events to MySQL in large
+    batches and reconnects with backoff while MySQL is unreachable.
+    """
+
+    def __init__(self, conn, log_sources, spool):
+        self.conn = conn
+        # The connection passed in already has its tables
+        self.tables_ready = conn is not None
+        self.sources = log_sources
+        self.spool = spool
+        self.stop = threading.Event()
+        self.line_queue = queue.Queue(maxsize=LINE_QUEUE_SIZE)
+        self.event_queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        # Checkpoint of the last spooled chunk per source, for the lag gauges
+        self.committed_checkpoints = {}
+        # Newest event time committed to MySQL, for the lag gauges
+        self.newest_event_time = None
+        self.expiries = ExpiryScheduler()
+        # monotonic time of the last event_feed prune; the first one happens right away
+        self.feed_pruned_at = float('-inf')
+        metrics.set_gauge("log_parser_lag_bytes", self._lag_bytes)
+        metrics.set_gauge("log_parser_lag_seconds", self._lag_seconds)
+        metrics.set_gauge("log_parser_spool_events", lambda: self.spool.count)
+        self.reader_stats = StageStats("readers", "lines", self.line_queue)
+        self.parser_stats = StageStats("parser", "lines", self.event_queue)
+        self.spooler_stats = StageStats("spooler", "events")
+        self.drainer_stats = StageStats("drainer", "events")
+        self.readers = [
+            threading.Thread(target=self._read, args=(source,), name=f"reader {source['name']}", daemon=True)
+            for source in log_sources
+        ]
+        self.parser = threading.Thread(target=self._run_stage, args=(self._parse,), name="parser", daemon=True)
+        self.spooler = threading.Thread(target=self._run_stage, args=(self._spool,), name="spooler", daemon=True)
+        self.drainer = threading.Thread(target=self._run_stage, args=(self._drain,), name="drainer", daemon=True)
+
+    def run(self):
+        """
+        Starts the stages and reports their stats until the spooler stops.
+        """
+        for thread in self.readers + [self.parser, self.spooler, self.drainer]:
+            thread.start()
+        try:
+            while self.spooler.is_alive():
+                self.spooler.join(PIPELINE_STATS_INTERVAL)
+                logging.info("Pipeline: " + " | ".join(stats.report() for stats in
+                                                       (self.reader_stats, self.parser_stats,
+                                                        self.spooler_stats, self.drainer_stats))
+                             + f" | spool: {self.spool.count} events")
+                if METRICS_LOG_SUMMARY:
+                    logging.info("Metrics: " + metrics.summary())
+        finally:
+            self.stop.set()
+            # The drainer finishes its current batch; the rest stays spooled for the next run
+            self.drainer.join()
+
+    def _run_stage(self, stage):
+        try:
+            stage()
+        except Exception as e:
+            logging.error(f"Pipeline stage {threading.current_thread().name} failed: {e}")
+            print(f"An unexpected error occurred: {e}")
+        finally:
+            self.stop.set()
+
+    def _end_of_input(self, out_queue, consumer):
+        """
+        Tells the next stage there is no more input, unless it has died already.
+        """
+        while consumer.is_alive():
+            try:
+                out_queue.put(None, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _read(self, source):
+        # A failing source only ends its own reader; the other sources keep going
+        tailer = None
+        try:
+            logging.info(f"Tailing log file at {source['path']} (source '{source['name']}')...")
+            print(f"Tailing log file at {source['path']} (source '{source['name']}')...")
+            # Resumes where the last run stopped; without a checkpoint the whole file is read
+            tailer = LogTailer(source['path'], load_checkpoint(checkpoint_path(source['name'])))
+            while not self.stop.is_set():
+                lines = tailer.read_lines()
+                if not lines:
+                    tailer.wait()
                     continue
-                
-                print(f"DEBUG: New line detected: {line.strip()}")
-                
-                line = line.strip()
-                if not line:
+                self.reader_stats.items += len(lines)
+                metrics.inc("log_parser_lines_read_total", len(lines), source=source['name'])
+                if not self.reader_stats.put((source, lines, tailer.log_date, tailer.checkpoint()), self.stop):
+                    break
+        except Exception as e:
+            logging.error(f"Reader for source '{source['name']}' failed: {e}")
+            print(f"Reader for source '{source['name']}' failed: {e}")
+        finally:
+            if tailer is not None:
+                tailer.close()
+            self._end_of_input(self.line_queue, self.parser)
+
+    def _parse(self):
+        # One parser for all sources keeps each source's chunks in order, which the checkpoints rely on
+        readers_left = len(self.readers)
+        try:
+            while readers_left:
+                item = self.line_queue.get()
+                if item is None:
+                    readers_left -= 1
                     continue
-                
-                # Get current date for timestamp
-                log_date_str = datetime.now().strftime("%Y-%m-%d")
-                line_matched = False
-                
+                source, lines, log_date_str, checkpoint = item
+                events = ParsedEvents()
+                for line in lines:
+                    process_line(line, events, log_date_str, source)
+                self.parser_stats.items += len(lines)
+                if not self.parser_stats.put((source, events, checkpoint), self.stop):
+                    break
+        finally:
+            self._end_of_input(self.event_queue, self.spooler)
+
+    def _lag_bytes(self):
+        lag = []
+        for source in self.sources:
+            checkpoint = self.committed_checkpoints.get(source['name'])
+            if checkpoint is None or os.path.abspath(checkpoint['path']) != os.path.abspath(source['path']):
+                continue  # Nothing spooled yet, or still draining a rotated archive
+            lag.append(({'source': source['name']}, max(0, os.path.getsize(source['path']) - checkpoint['offset'])))
+        return lag
+
+    def _lag_seconds(self):
+        newest = self.newest_event_time
+        return (datetime.now() - newest).total_seconds() if newest else None
+
+    def _spool(self):
+        while True:
+            item = self.event_queue.get()
+            if item is None:
+                break
+            source, events, checkpoint = item
+            if not self.spool.append(events, self.stop):
+                break
+            # The events are on disk, so the source can resume after them
+            save_checkpoint(checkpoint_path(source['name']), checkpoint)
+            self.committed_checkpoints[source['name']] = checkpoint
+            self.spooler_stats.items += len(events)
+
+    def _connect(self):
+        """
+        Opens a MySQL connection, migrating the schema on the first success and
+        loading the pending punishment expiries. Returns None if MySQL is unreachable.
+        """
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        if not self.tables_ready:
+            if not migrate_schema(conn):
+                conn.close()
+                return None
+            self.tables_ready = True
+        return conn if self._load_expiries(conn) else None
+
+    def _load_expiries(self, conn):
+        """
+        Loads the expiry heap; on failure the connection is closed and False returned.
+        """
+        try:
+            cursor = conn.cursor()
+            try:
+                self.expiries.load(cursor)
+                conn.commit()
+            finally:
+                cursor.close()
+            return True
+        except mysql.connector.Error as err:
+            logging.warning(f"Loading punishment expiries failed: {err}")
+            conn.close()
+            return False
+
+    def _expire_punishments(self):
+        """
+        Recomputes the flags of the players whose temporary punishments just ran
+        out, in one batched query. Another punishment may still be active.
+        """
+        due = self.expiries.pop_due()
+        if not due:
+            return
+        cursor = self.conn.cursor()
+        try:
+            with metrics.timer("log_parser_db_statement_seconds", statement="punishment_flags"):
+                refresh_punishment_flags(cursor, due)
+            self.conn.commit()
+            metrics.inc("log_parser_expired_punishments_total", len(due))
+        finally:
+            cursor.close()
+
+    def _prune_event_feed(self):
+        """
+        Drops old event_feed rows, at most every EVENT_FEED_PRUNE_INTERVAL seconds.
+        """
+        if time.monotonic() - self.feed_pruned_at < EVENT_FEED_PRUNE_INTERVAL:
+            return
+        cursor = self.conn.cursor()
+        try:
+            with metrics.timer("log_parser_db_statement_seconds", statement="event_feed_prune"):
+                prune_event_feed(cursor)
+            self.conn.commit()
+            self.feed_pruned_at = time.monotonic()
+        finally:
+            cursor.close()
+
+    def _disconnect(self):
+        try:
+            self.conn.close()
+        except mysql.connector.Error:
+            pass
+        self.conn = None
+
+    def _write_events(self, events):
+        """
+        Writes spooled events in one transaction. Returns the batcher and the
+        error that failed the write, or None.
+        """
+        # Flushed explicitly, once per call
+        batcher = EventBatcher(self.conn, max_rows=len(events) + 1, publish_feed=True)
+        try:
+            for _, table, row, log_message in events:
+                # A copy, so a retry starts again from the spooled row
+                batcher.add(table, dict(row), log_message)
+            if batcher.flush():
+                return batcher, None
+            return batcher, batcher.last_error
+        except Exception as err:
+            # A spooled row the batch cannot handle fails it like a rejected insert
+            try:
+                self.conn.rollback()
+            except mysql.connector.Error:
+                pass
+            return batcher, err
+
+    def _retryable(self, error):
+        """
+        Whether a failed write should stay spooled for a fresh connection.
+        """
+        if isinstance(error, mysql.connector.Error) and error.errno in RETRYABLE_DB_ERRORS:
+            return True
+        return not self.conn.is_connected()
+
+    def _write_isolating(self, events):
+        """
+        Writes a rejected batch in halves, down to single events, so only the
+        events that fail on their own are dropped. Returns the batchers written
+        and the retryable error that stopped it, or None. Parts written before
+        such an error are deduplicated by content_key when the batch is retried.
+        """
+        batchers = []
+        parts = [events]
+        while parts:
+            part = parts.pop()
+            batcher, error = self._write_events(part)
+            if error is None:
+                batchers.append(batcher)
+            elif self._retryable(error):
+                return batchers, error
+            elif len(part) == 1:
+                event_id, table, row, _ = part[0]
+                logging.error("Dropping spooled %s event %d (%s): %r", table, event_id, error, row)
+            else:
+                middle = len(part) // 2
+                parts += [part[middle:], part[:middle]]
+        return batchers, None
+
+    def _drain(self):
+        if self.conn is not None and not self._load_expiries(self.conn):
+            self.conn = None
+        delay = RECONNECT_MIN_DELAY
+        try:
+            while not self.stop.is_set():
+                if self.conn is None:
+                    self.conn = self._connect()
+                    if self.conn is None:
+                        logging.warning("MySQL unreachable, retrying in %ss (%d events spooled).",
+                                        delay, self.spool.count, extra=RATE_LIMITED)
+                        self.stop.wait(delay)
+                        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                        continue
+                    delay = RECONNECT_MIN_DELAY
+
                 try:
-                    # Check for ban
-                    ban_match = ban_pattern.search(line)
-                    if ban_match:
-                        print(f"DEBUG: Match: Ban - {ban_match.groups()}")
-                        line_matched = True
-                        log_time_str, username, duration, reason = ban_match.groups()
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        expires_at = parse_duration_to_datetime(duration, timestamp)
-                        
-                        check_conditions = {
-                            'username': username,
-                            'punishment_type': 'Ban',
-                            'punishment_timestamp': timestamp,
-                            'reason': reason
-                        }
-                        insert_query = """
-                            INSERT INTO punishments (username, punishment_type, duration, reason, punishment_timestamp, expires_at) 
-                            VALUES (%s, 'Ban', %s, %s, %s, %s)
-                        """
-                        insert_params = (username, duration, reason, timestamp, expires_at)
-                        
-                        if check_duplicate_and_insert(conn, 'punishments', check_conditions, insert_query, insert_params, f"{username} banned for {duration}"):
-                            update_player_status(conn, username)
-
-                    # Check for mute
-                    mute_match = mute_pattern.search(line)
-                    if mute_match:
-                        print(f"DEBUG: Match: Mute - {mute_match.groups()}")
-                        line_matched = True
-                        log_time_str, username, duration, reason = mute_match.groups()
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        expires_at = parse_duration_to_datetime(duration, timestamp)
-                        
-                        check_conditions = {
-                            'username': username,
-                            'punishment_type': 'Mute',
-                            'punishment_timestamp': timestamp,
-                            'reason': reason
-                        }
-                        insert_query = """
-                            INSERT INTO punishments (username, punishment_type, duration, reason, punishment_timestamp, expires_at) 
-                            VALUES (%s, 'Mute', %s, %s, %s, %s)
-                        """
-                        insert_params = (username, duration, reason, timestamp, expires_at)
-                        
-                        if check_duplicate_and_insert(conn, 'punishments', check_conditions, insert_query, insert_params, f"{username} muted for {duration}"):
-                            update_player_status(conn, username)
-
-                    # Check for report
-                    report_match = report_pattern.search(line)
-                    if report_match:
-                        print(f"DEBUG: Match: Report - {report_match.groups()}")
-                        line_matched = True
-                        log_time_str, reporter, reported, reason, server = report_match.groups()
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        
-                        check_conditions = {
-                            'reporter_name': reporter,
-                            'reported_name': reported,
-                            'report_timestamp': timestamp,
-                            'reason': reason
-                        }
-                        insert_query = """
-                            INSERT INTO reports (reporter_name, reported_name, reason, server_name, report_timestamp) 
-                            VALUES (%s, %s, %s, %s, %s)
-                        """
-                        insert_params = (reporter, reported, reason, server, timestamp)
-                        
-                        if check_duplicate_and_insert(conn, 'reports', check_conditions, insert_query, insert_params, f"{reporter} reported {reported}"):
-                            update_player_status(conn, reporter)
-                            update_player_status(conn, reported)
-
-                    # Check for filtered chat (swear)
-                    chat_swear_match = chat_swear_pattern.search(line)
-                    if chat_swear_match:
-                        print(f"DEBUG: Match: Chat (swear) - {chat_swear_match.groups()}")
-                        line_matched = True
-                        log_time_str, username, server, message = chat_swear_match.groups()
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        
-                        check_conditions = {
-                            'username': username,
-                            'chat_timestamp': timestamp,
-                            'message': message,
-                            'message_type': 'swear_filtered'
-                        }
-                        insert_query = """
-                            INSERT INTO chat_messages (username, message, message_type, server_name, chat_timestamp) 
-                            VALUES (%s, %s, 'swear_filtered', %s, %s)
-                        """
-                        insert_params = (username, message, server, timestamp)
-                        
-                        if check_duplicate_and_insert(conn, 'chat_messages', check_conditions, insert_query, insert_params, f"swear filtered - {username}"):
-                            update_player_status(conn, username)
-
-                    # Check for filtered chat (advertise)
-                    chat_advertise_match = chat_advertise_pattern.search(line)
-                    if chat_advertise_match:
-                        print(f"DEBUG: Match: Chat (advertise) - {chat_advertise_match.groups()}")
-                        line_matched = True
-                        log_time_str, username, server, message = chat_advertise_match.groups()
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        
-                        check_conditions = {
-                            'username': username,
-                            'chat_timestamp': timestamp,
-                            'message': message,
-                            'message_type': 'advertise_filtered'
-                        }
-                        insert_query = """
-                            INSERT INTO chat_messages (username, message, message_type, server_name, chat_timestamp) 
-                            VALUES (%s, %s, 'advertise_filtered', %s, %s)
-                        """
-                        insert_params = (username, message, server, timestamp)
-                        
-                        if check_duplicate_and_insert(conn, 'chat_messages', check_conditions, insert_query, insert_params, f"advertise filtered - {username}"):
-                            update_player_status(conn, username)
-
-                    # Check for normal chat
-                    chat_normal_match = chat_normal_pattern.search(line)
-                    if chat_normal_match:
-                        print(f"DEBUG: Match: Chat (normal) - {chat_normal_match.groups()}")
-                        line_matched = True
-                        log_time_str, username, message = chat_normal_match.groups()
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        
-                        check_conditions = {
-                            'username': username,
-                            'chat_timestamp': timestamp,
-                            'message': message,
-                            'message_type': 'normal'
-                        }
-                        insert_query = """
-                            INSERT INTO chat_messages (username, message, message_type, server_name, chat_timestamp) 
-                            VALUES (%s, %s, 'normal', NULL, %s)
-                        """
-                        insert_params = (username, message, timestamp)
-                        
-                        if check_duplicate_and_insert(conn, 'chat_messages', check_conditions, insert_query, insert_params, f"chat - {username}"):
-                            update_player_status(conn, username)
-
-                    # Check for kills (optional)
-                    kill_match = kill_pattern.search(line)
-                    if kill_match:
-                        print(f"DEBUG: Match: Kill - {kill_match.groups()}")
-                        line_matched = True
-                        log_time_str, killed, killer = kill_match.groups()  # killed comes first, killer second
-                        timestamp = datetime.strptime(f"{log_date_str} {log_time_str}", "%Y-%m-%d %H:%M:%S")
-                        
-                        check_conditions = {
-                            'killer': killer,
-                            'killed': killed,
-                            'timestamp': timestamp
-                        }
-                        insert_query = """
-                            INSERT INTO kill_events (killer, killed, timestamp) 
-                            VALUES (%s, %s, %s)
-                        """
-                        insert_params = (killer, killed, timestamp)
-                        
-                        if check_duplicate_and_insert(conn, 'kill_events', check_conditions, insert_query, insert_params, f"{killer} killed {killed}"):
-                            update_player_status(conn, killer)
-                            update_player_status(conn, killed)
-                    
-                    # If no patterns matched
-                    if not line_matched:
-                        print("DEBUG: No Match")
+                    self._expire_punishments()
+                    self._prune_event_feed()
+                except mysql.connector.Error as err:
+                    # Reconnecting reloads the expiries and fixes the flags left stale
+                    logging.warning("Housekeeping failed (%s), reconnecting.", err, extra=RATE_LIMITED)
+                    self._disconnect()
+                    continue
+
+                events = self.spool.read(SPOOL_DRAIN_ROWS)
+                if not events:
+                    self.spool.wait(BATCH_MAX_AGE)
+                    continue
+
+                batcher, error = self._write_events(events)
+                batchers = [batcher]
+                if error is not None and not self._retryable(error):
+                    logging.warning("MySQL rejected a batch of %d events (%s), writing it in parts.",
+                                    len(events), error)
+                    batchers, error = self._write_isolating(events)
+                if error is not None:
+                    # Keep the batch spooled and retry it on a fresh connection
+                    logging.warning("MySQL write failed (%s), keeping %d events spooled.",
+                                    error, len(events), extra=RATE_LIMITED)
+                    self._disconnect()
+                    continue
+                self.spool.delete_through(events[-1][0])
+                for batcher in batchers:
+                    for expires_at, username in batcher.expiries:
+                        self.expiries.add(expires_at, username)
+                    if batcher.newest_event_time and (self.newest_event_time is None
+                                                      or batcher.newest_event_time > self.newest_event_time):
+                        self.newest_event_time = batcher.newest_event_time
+                self.drainer_stats.items += len(events)
+        finally:
+            if self.conn is not None:
+                self._disconnect()
+                print("Database connection closed.")
+
+def checkpoint_path(source_name):
+    """
+    Returns the checkpoint file of a log source.
+    """
+    if source_name == "default":
+        return CHECKPOINT_FILE
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", source_name)
+    return f"{os.path.splitext(CHECKPOINT_FILE)[0]}.{safe_name}.json"
+
+def expand_log_sources(log_sources):
+    """
+    Expands glob paths in LOG_SOURCES into one source per matching file.
+    Sources whose file doesn't exist are reported and skipped.
+    """
+    expanded = []
+    for source in log_sources:
+        path = source['path']
+        if not glob.has_magic(path):
+            if os.path.exists(path):
+                expanded.append(dict(source))
+            else:
+                logging.error(f"Log file not found at: {path}")
+                print(f"Error: Log file not found at: {path}")
+            continue
+
+        matches = sorted(glob.glob(path))
+        if not matches:
+            logging.error(f"No log files match: {path}")
+            print(f"Error: No log files match: {path}")
+        # Name each match after the path component its first wildcard matched
+        pattern_parts = os.path.normpath(path).split(os.sep)
+        wildcard = next(i for i, part in enumerate(pattern_parts) if glob.has_magic(part))
+        for match in matches:
+            match_parts = os.path.normpath(match).split(os.sep)
+            expanded.append(dict(source, name=f"{source['name']}/{match_parts[wildcard]}", path=match))
+    return expanded
+
+def tail_log_file_and_insert_data(conn, log_sources):
+    """
+    Continuously tails all log sources, processes new lines, and inserts data into the database.
+    conn may be None if MySQL is unreachable; events are spooled until it comes back.
+    """
+    try:
+        sources = expand_log_sources(log_sources)
+        if not sources:
+            return
+        names = [source['name'] for source in sources]
+        if len(set(names)) != len(names):
+            logging.error(f"Log source names must be unique: {names}")
+            print(f"Error: Log source names must be unique: {names}")
+            return
+
+        spool = EventSpool()
+        try:
+            IngestPipeline(conn, sources, spool).run()
+        finally:
+            spool.close()
 
-                except Exception as e:
-                    logging.error(f"Error processing line: {e}")
-                    print(f"Processing error: {e}")
-                    
     except Exception as e:
         logging.error(f"An unexpected error occurred during log parsing: {e}")
         print(f"An unexpected error occurred: {e}")
 
-if __name__ == "__main__":
+# --- Backfill ---
+
+def find_archived_logs(source):
+    """
+    Expands a directory (all *.log.gz in it) or a glob pattern into a sorted list of files.
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.log.gz")
+    return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+
+def init_backfill_worker(worker_log_queue, level):
+    """
+    Pool initializer: sends a backfill worker's log records to the parent, which
+    writes them. A forked worker inherits the queue handler but not the listener
+    thread draining it, so without this its records would never reach the log.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.handlers.QueueHandler(worker_log_queue)
+    handler.addFilter(RateLimitFilter())
+    root.addHandler(handler)
+    set_log_level(level)
+
+def backfill_file(path, use_load_data=False):
+    """
+    Parses one archived log into the database. Runs in a worker process with its own
+    connection; the file is decompressed as a stream. Returns a stats dict, which
+    counts the batches (and their rows) lost to failed flushes.
+    """
+    start = time.perf_counter()
+    log_date_str = log_date_from_path(path)
+    if not log_date_str:
+        log_date_str = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+        logging.warning(f"No date in the name of {path}, using its modification date {log_date_str}.")
+
+    conn = get_db_connection(allow_local_infile=use_load_data)
+    if not conn:
+        raise RuntimeError(f"No database connection for {path}")
+
+    batcher_class = LoadDataBatcher if use_load_data else EventBatcher
+    batcher = batcher_class(conn, max_rows=BACKFILL_BATCH_ROWS)
+    reader = LogReader(path)
+    lines_read = 0
+    try:
+        while True:
+            lines = reader.read_lines() or reader.finish()
+            if not lines:
+                break
+            lines_read += len(lines)
+            for line in lines:
+                process_line(line, batcher, log_date_str)
+        batcher.flush()
+    finally:
+        reader.close()
+        conn.close()
+
+    return {
+        'path': path,
+        'compressed_bytes': os.path.getsize(path),
+        'bytes': reader.read_pos,
+        'lines': lines_read,
+        'failed_batches': batcher.failed_batches,
+        'failed_rows': batcher.failed_rows,
+        'seconds': time.perf_counter() - start
+    }
+
+def secondary_indexes(conn, tables):
+    """
+    Returns (table, index_name, columns, index_type) for every non-unique secondary
+    index of the given tables, with columns in index order. Indexes leading with a
+    foreign key column are left out: MySQL won't drop the index a foreign key uses.
+    """
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(tables))
+        cursor.execute(f"""
+            SELECT TABLE_NAME, INDEX_NAME, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX), MAX(INDEX_TYPE)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders}) AND NON_UNIQUE = 1
+            GROUP BY TABLE_NAME, INDEX_NAME
+        """, tuple(tables))
+        indexes = [(table, name, columns.split(","), index_type) for table, name, columns, index_type in cursor.fetchall()]
+        cursor.execute(f"""
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders}) AND REFERENCED_TABLE_NAME IS NOT NULL
+        """, tuple(tables))
+        foreign_keys = set(cursor.fetchall())
+        return [index for index in indexes if (index[0], index[2][0]) not in foreign_keys]
+    finally:
+        cursor.close()
+
+def drop_indexes(conn, indexes):
+    cursor = conn.cursor()
+    try:
+        for table, name, columns, index_type in indexes:
+            logging.info(f"Dropping index {table}.{name} for the backfill.")
+            print(f"Dropping index {table}.{name} for the backfill.")
+            cursor.execute(f"ALTER TABLE {table} DROP INDEX {name}")
+    finally:
+        cursor.close()
+
+def restore_indexes(conn, indexes):
+    cursor = conn.cursor()
+    try:
+        # Some may never have been dropped, or already be rebuilt by an earlier attempt
+        cursor.execute("SELECT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()")
+        present = {tuple(row) for row in cursor.fetchall()}
+        for table, name, columns, index_type in indexes:
+            if (table, name) in present:
+                continue
+            logging.info(f"Rebuilding index {table}.{name}...")
+            print(f"Rebuilding index {table}.{name}...")
+            kind = "FULLTEXT INDEX" if index_type == "FULLTEXT" else "INDEX"
+            cursor.execute(f"ALTER TABLE {table} ADD {kind} {name} ({', '.join(columns)})")
+    finally:
+        cursor.close()
+
+def restore_dropped_indexes(conn):
+    """
+    Rebuilds the indexes recorded in DROPPED_INDEXES_FILE, then forgets them.
+    """
+    dropped = load_checkpoint(DROPPED_INDEXES_FILE)
+    if dropped:
+        restore_indexes(conn, dropped)
+    if dropped is not None:
+        os.remove(DROPPED_INDEXES_FILE)
+
+def backfill(source, workers=None, use_load_data=False, without_indexes=False):
+    """
+    Loads archived .log.gz files that never went through the live parser, one file
+    per worker process, and reports throughput in MB/s of uncompressed log.
+    Returns False if a file failed or lost a batch.
+    """
+    paths = find_archived_logs(source)
+    if not paths:
+        print(f"No archived logs found for {source}")
+        return True
+
+    conn = get_db_connection()
+    if not conn:
+        logging.error("Failed to establish a database connection. Exiting.")
+        print("Failed to establish a database connection. Exiting.")
+        return False
+    if not migrate_schema(conn):
+        conn.close()
+        return False
+
+    dropped = []
+    # Written by this process's handlers, like its own records
+    worker_log_queue = multiprocessing.Queue()
+    worker_log_listener = logging.handlers.QueueListener(worker_log_queue, log_file_handler, log_console_handler,
+                                                         respect_handler_level=True)
+    worker_log_listener.start()
+    try:
+        # Left behind by a backfill that died with its indexes dropped
+        restore_dropped_indexes(conn)
+        if without_indexes:
+            # Rebuilding secondary indexes once at the end beats maintaining them per row
+            dropped = secondary_indexes(conn, list(TABLE_COLUMNS))
+            # Recorded first, so even a killed run leaves a way back
+            save_checkpoint(DROPPED_INDEXES_FILE, dropped)
+            drop_indexes(conn, dropped)
+
+        print(f"Backfilling {len(paths)} files...")
+        logging.info(f"Backfilling {len(paths)} files from {source}")
+        start = time.perf_counter()
+        total_bytes = total_compressed = total_lines = 0
+        failed_files = failed_rows = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_backfill_worker,
+                                 initargs=(worker_log_queue, logging.getLogger().level)) as pool:
+            futures = {pool.submit(backfill_file, path, use_load_data): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    logging.error(f"Backfill of {futures[future]} failed: {e}")
+                    print(f"Backfill of {futures[future]} failed: {e}")
+                    failed_files += 1
+                    continue
+                total_bytes += stats['bytes']
+                total_compressed += stats['compressed_bytes']
+                total_lines += stats['lines']
+                rate = stats['bytes'] / 1e6 / stats['seconds'] if stats['seconds'] else 0
+                print(f"{os.path.basename(stats['path'])}: {stats['bytes'] / 1e6:.1f} MB, {stats['lines']} lines, {rate:.1f} MB/s")
+                if stats['failed_batches']:
+                    # The file is incomplete in the database; the rows lost were logged by the flush
+                    failed_files += 1
+                    failed_rows += stats['failed_rows']
+                    logging.error(f"Backfill of {stats['path']} failed: lost {stats['failed_rows']} rows "
+                                  f"in {stats['failed_batches']} batches")
+                    print(f"Backfill of {stats['path']} failed: lost {stats['failed_rows']} rows "
+                          f"in {stats['failed_batches']} batches")
+    finally:
+        worker_log_listener.stop()
+        if dropped:
+            restore_dropped_indexes(conn)
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    summary = (f"Backfill done: {total_bytes / 1e6:.1f} MB ({total_compressed / 1e6:.1f} MB compressed), "
+               f"{total_lines} lines in {elapsed:.1f}s = {total_bytes / 1e6 / elapsed:.1f} MB/s")
+    if failed_files:
+        summary += f"; {failed_files} of {len(paths)} files failed, {failed_rows} rows lost"
+        logging.error(summary)
+    else:
+        logging.info(summary)
+    print(summary)
+    return not failed_files
+
+def run_tailer():
     print("Starting continuous log file parser...")
     logging.info("Starting continuous log file parser...")
     conn = get_db_connection()
-    if conn:
-        create_tables(conn)
-        tail_log_file_and_insert_data(conn, LOG_FILE_PATH)
+    if conn and not migrate_schema(conn):
+        # The drainer retries the migration when it reconnects
         conn.close()
-        print("Database connection closed.")
+        conn = None
+    if not conn:
+        logging.warning("MySQL is unreachable; events are spooled to disk until it can be reached.")
+        print("MySQL is unreachable; events are spooled to disk until it can be reached.")
     else:
-        logging.error("Failed to establish a database connection. Exiting.")
-        print("Failed to establish a database connection. Exiting.")
\ No newline at end of file
+        try:
+            restore_dropped_indexes(conn)
+        except mysql.connector.Error as err:
+            # Kept in DROPPED_INDEXES_FILE for the next start
+            logging.error(f"Could not rebuild the indexes a backfill dropped: {err}")
+            print(f"Could not rebuild the indexes a backfill dropped: {err}")
+    start_metrics_server()
+    # The pipeline's drainer owns the connection from here on and closes it
+    tail_log_file_and_insert_data(conn, LOG_SOURCES)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parses Minecraft client logs into MySQL. Without a command, tails LOG_SOURCES.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Trace every line and event (DEBUG logging)")
+    commands = parser.add_subparsers(dest="command")
+    backfill_parser = commands.add_parser("backfill", help="Load archived YYYY-MM-DD-N.log.gz files")
+    backfill_parser.add_argument("source", help="Directory of archived logs or a glob pattern")
+    backfill_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    backfill_parser.add_argument("--load-data", action="store_true", help="Load rows with LOAD DATA LOCAL INFILE from generated TSV")
+    backfill_parser.add_argument("--drop-indexes", action="store_true", help="Drop secondary indexes during the load and rebuild them afterwards")
+    args = parser.parse_args()
+    if args.verbose:
+        set_log_level(logging.DEBUG)
+
+    if args.command == "backfill":
+        if not backfill(args.source, args.workers, args.load_data, args.drop_indexes):
+            sys.exit(1)
+    else:
+        run_tailer()